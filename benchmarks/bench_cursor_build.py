@@ -0,0 +1,76 @@
+"""
+Micro benchmark for building EsCursor queries.
+
+Measures the cost of constructing a cursor with a typical set of clauses, of also serializing the request body as
+it is sent to the cluster, and of deriving a query from a cloned base query. No cluster is needed; the query
+builder is exercised directly::
+
+    $ python benchmarks/bench_cursor_build.py
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eswrap.core.es_query.es_query import EsQuery  # noqa: E402
+
+
+def construct():
+    return (
+        EsQuery()
+        .filter("term", status="published")
+        .filter("range", created={"gte": "now-7d"})
+        .query("match", title="elasticsearch")
+        .exclude("terms", tags=["spam", "draft"])
+        .set_limit(25)
+        .set_skip(50)
+        .set_sort([{"created": "desc"}])
+    )
+
+
+def construct_and_serialize():
+    return json.dumps(construct().filter_data)
+
+
+def derive_from_base(base: EsQuery):
+    def derive():
+        return json.dumps(base.clone().query("match", title="elasticsearch").filter_data)
+
+    return derive
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the result as json")
+    args = parser.parse_args()
+
+    cases = {
+        "construct": construct,
+        "construct_and_serialize": construct_and_serialize,
+    }
+
+    if hasattr(EsQuery, "clone"):
+        base = EsQuery().filter("term", status="published").set_limit(25)
+        cases["derive_from_base"] = derive_from_base(base)
+
+    result = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        result[name] = {"us_per_cursor": round(best / args.number * 1e6, 3)}
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for name, values in result.items():
+            print(f"{name}: {values['us_per_cursor']} us per cursor")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Import time benchmark for eswrap.
+
+Every sample runs in a fresh interpreter with ``-X importtime`` and reports the cumulative import time of the
+``eswrap`` package. The script exits with a non-zero status when the median exceeds the budget, so it can be run
+as a regression gate::
+
+    $ python benchmarks/bench_import.py
+    $ python benchmarks/bench_import.py --statement "from eswrap import EsWrap" --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the bare package import must not pull in the elasticsearch client
+DEFAULT_BUDGET_MS = 25.0
+
+
+def measure(statement: str, module: str = "eswrap") -> float:
+    """
+    Run the statement in a fresh interpreter and return the cumulative import time of module and its lazily
+    imported submodules in milliseconds
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR, PYTHONDONTWRITEBYTECODE="")
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total = 0
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        match = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s?(\s*)(\S+)", line)
+        if (
+            match
+            and not match.group(2)
+            and (match.group(3) == module or match.group(3).startswith(module + "."))
+        ):
+            total += int(match.group(1))
+
+    return total / 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--statement", default="import eswrap")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="print the result as json")
+    args = parser.parse_args()
+
+    # warm up the bytecode cache
+    measure(args.statement)
+
+    samples = [measure(args.statement) for _ in range(args.runs)]
+
+    result = {
+        "statement": args.statement,
+        "runs": args.runs,
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "budget_ms": args.budget_ms,
+    }
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(
+            f"{result['statement']!r}: median {result['median_ms']} ms "
+            f"(min {result['min_ms']} ms, max {result['max_ms']} ms, budget {result['budget_ms']} ms)"
+        )
+
+    return 0 if result["median_ms"] <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Offline benchmark suite for the eswrap hot paths.
+
+Every case runs against a canned response transport node (see fake_node.py), so no cluster or network is needed
+and the numbers only reflect eswrap and the client stack. The cases cover building cursors, parsing search
+responses in search() and execute(), filling the index registry with thousands of indexes and bulk writing::
+
+    $ python benchmarks/bench_suite.py --output before.json
+    $ git checkout my-branch
+    $ python benchmarks/bench_suite.py --baseline before.json
+
+With --baseline, every case is compared against the saved run and the script exits with a non-zero status when a
+case got slower than the allowed --tolerance, so a change can be accepted or rejected on data.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import elasticsearch  # noqa: E402
+
+from bench_cursor_build import construct_and_serialize  # noqa: E402
+from eswrap.core.client.client import client_options  # noqa: E402
+from eswrap.core.es_handler.es_handler import EsHandler  # noqa: E402
+from eswrap.core.index_list.index_list import IndexList  # noqa: E402
+from fake_node import (  # noqa: E402
+    bulk_response,
+    canned_client,
+    index_list_response,
+    search_response,
+)
+
+SEARCH_HITS = 100
+INDEXES = 5000
+BULK_DOCUMENTS = 10000
+
+
+def case_cursor_build():
+    return construct_and_serialize, 1, ("cursor", "cursors")
+
+
+def case_search_parse():
+    client = canned_client([("POST", "/bench/_search", search_response(SEARCH_HITS))])
+    handler = EsHandler(client, "bench")
+
+    def run():
+        handler.search().filter("term", status="published").search()
+
+    return run, SEARCH_HITS, ("hit", "hits")
+
+
+def case_execute_parse():
+    client = canned_client([("POST", "/bench/_search", search_response(SEARCH_HITS))])
+    handler = EsHandler(client, "bench")
+
+    def run():
+        handler.search().filter("term", status="published").execute()
+
+    return run, SEARCH_HITS, ("hit", "hits")
+
+
+def case_execute_parse_fast_json():
+    client = canned_client(
+        [("POST", "/bench/_search", search_response(SEARCH_HITS))],
+        **client_options(fast_json=True),
+    )
+    handler = EsHandler(client, "bench")
+
+    def run():
+        handler.search().filter("term", status="published").execute()
+
+    return run, SEARCH_HITS, ("hit", "hits")
+
+
+def case_iter_hits():
+    client = canned_client([("POST", "/bench/_search", search_response(SEARCH_HITS))])
+    handler = EsHandler(client, "bench")
+
+    def run():
+        for hit in handler.search().filter("term", status="published").iter_hits():
+            hit.id
+
+    return run, SEARCH_HITS, ("hit", "hits")
+
+
+def case_fill_index_list():
+    client = canned_client([("POST", "/_resolve/index", index_list_response(INDEXES))])
+
+    def run():
+        IndexList(client).fill_index_list()
+
+    return run, INDEXES, ("index", "indexes")
+
+
+def case_refresh_index_list():
+    client = canned_client([("POST", "/_resolve/index", index_list_response(INDEXES))])
+    index_list = IndexList(client)
+    index_list.fill_index_list()
+
+    return index_list.fill_index_list, INDEXES, ("index", "indexes")
+
+
+def case_bulk_write():
+    client = canned_client([("PUT", "/_bulk", bulk_response), ("POST", "/_bulk", bulk_response)])
+    handler = EsHandler(client, "bench")
+
+    documents = [
+        {"_id": str(i), "title": f"document {i}", "count": i, "tags": ["a", "b", "c"]}
+        for i in range(BULK_DOCUMENTS)
+    ]
+
+    def run():
+        result = handler.bulk_upsert(documents)
+        assert result["success"] == BULK_DOCUMENTS, result
+
+    return run, BULK_DOCUMENTS, ("document", "documents")
+
+
+CASES = {
+    "cursor_build": (case_cursor_build, 5000),
+    "search_parse": (case_search_parse, 200),
+    "execute_parse": (case_execute_parse, 200),
+    "execute_parse_fast_json": (case_execute_parse_fast_json, 200),
+    "iter_hits": (case_iter_hits, 200),
+    "fill_index_list": (case_fill_index_list, 10),
+    "refresh_index_list": (case_refresh_index_list, 10),
+    "bulk_write": (case_bulk_write, 2),
+}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_case(name: str, repeat: int, scale: float) -> dict:
+    """
+    Run a case and return the best time per call and the derived time and throughput per unit of work
+    """
+    setup, number = CASES[name]
+    func, units, (unit, plural) = setup()
+
+    number = max(1, int(number * scale))
+
+    # warm up caches and lazy imports outside of the measurement
+    func()
+
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+    return {
+        "ms_per_call": round(best * 1e3, 4),
+        f"us_per_{unit}": round(best / units * 1e6, 4),
+        f"{plural}_per_second": round(units / best, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Print the change of every case against the baseline; return False if any case is slower than tolerance
+    """
+    ok = True
+
+    for name, values in results["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+
+        if before is None:
+            print(f"{name:<20} {values['ms_per_call']:>10.4f} ms  (no baseline)")
+            continue
+
+        change = values["ms_per_call"] / before["ms_per_call"] - 1
+        regressed = change > tolerance
+        ok = ok and not regressed
+
+        print(
+            f"{name:<20} {before['ms_per_call']:>10.4f} -> {values['ms_per_call']:>10.4f} ms"
+            f"  {change:+.1%}{'  REGRESSION' if regressed else ''}"
+        )
+
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cases", nargs="*", help=f"cases to run, default all of: {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the number of calls per repeat")
+    parser.add_argument("--output", help="write the results as json to this file")
+    parser.add_argument("--baseline", help="compare against the results in this json file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown against the baseline")
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args()
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "elasticsearch": elasticsearch.__versionstr__,
+        "repeat": args.repeat,
+        "scale": args.scale,
+        "cases": {name: run_case(name, args.repeat, args.scale) for name in args.cases or CASES},
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            return 0 if compare(results, json.load(f), args.tolerance) else 1
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for name, values in results["cases"].items():
+            print(f"{name}: " + ", ".join(f"{v} {k}" for k, v in values.items()))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
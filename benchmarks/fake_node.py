@@ -0,0 +1,173 @@
+"""
+Canned response transport node for the offline benchmarks.
+
+CannedNode stands in for the http node of elastic_transport; requests never leave the process and are answered
+from a list of routes, so the benchmarks measure eswrap and the client stack rather than the network or a cluster::
+
+    client = canned_client([
+        ("POST", "/_resolve/index", {"indices": [{"name": "a"}, {"name": "b"}]}),
+        ("POST", "/_bulk", bulk_response),
+    ])
+
+A route is a (method, target prefix, response) tuple; the response is a json serializable object, pre-encoded
+bytes or a callable taking the request body and returning either of those, or a (status, response) tuple to
+answer with another status than 200. The first matching route wins, unmatched requests are answered with 404.
+"""
+import inspect
+import json
+from typing import Callable, List, Tuple, Union
+
+from elastic_transport import ApiResponseMeta, BaseAsyncNode, BaseNode, HttpHeaders
+from elastic_transport._node._base import NodeApiResponse
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+Response = Union[bytes, dict, list, Callable[[bytes], Union[bytes, dict, list]]]
+
+NOT_FOUND = json.dumps({"error": "no canned response", "status": 404}).encode()
+
+
+def encode(payload) -> bytes:
+    return payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+
+
+class CannedNode(BaseNode):
+    """
+    Transport node answering from the routes class attribute; use canned_client() to get a client bound to a set
+    of routes
+    """
+
+    routes: List[Tuple[str, str, Response]] = []
+
+    def perform_request(self, method, target, body=None, headers=None, request_timeout=None):
+        return self.respond(*self.route(method, target, body))
+
+    def route(self, method, target, body) -> tuple:
+        """
+        Return the (status, response) of the first matching route; the response is not encoded yet and may be
+        awaitable (a coroutine function route, with the AsyncCannedNode)
+        """
+        for route_method, prefix, response in self.routes:
+            if method == route_method and target.startswith(prefix):
+                return 200, response(body) if callable(response) else response
+
+        return 404, NOT_FOUND
+
+    def respond(self, status: int, raw) -> NodeApiResponse:
+        if isinstance(raw, tuple):
+            status, raw = raw
+        raw = encode(raw)
+
+        response_headers = HttpHeaders(
+            {
+                "content-type": "application/json",
+                "x-elastic-product": "Elasticsearch",
+                "content-length": str(len(raw)),
+            }
+        )
+
+        meta = ApiResponseMeta(
+            status=status,
+            http_version="1.1",
+            headers=response_headers,
+            duration=0.0,
+            node=self.config,
+        )
+
+        return NodeApiResponse(meta, raw)
+
+    def close(self):
+        pass
+
+
+class AsyncCannedNode(CannedNode, BaseAsyncNode):
+    """
+    The asyncio counterpart of the CannedNode; routes may also be coroutine functions, awaited while the request
+    is in flight. Use canned_async_client() to get a client bound to a set of routes.
+    """
+
+    async def perform_request(
+        self, method, target, body=None, headers=None, request_timeout=None
+    ):
+        status, raw = self.route(method, target, body)
+
+        if inspect.isawaitable(raw):
+            raw = await raw
+
+        return self.respond(status, raw)
+
+    async def close(self):
+        pass
+
+
+def canned_client(routes: List[Tuple[str, str, Response]], **kwargs) -> Elasticsearch:
+    """
+    Return an Elasticsearch client whose only node answers from routes; static responses are encoded once. Other
+    kwargs are passed on to the client.
+    """
+    routes = [(m, p, r if callable(r) else encode(r)) for m, p, r in routes]
+
+    node_class = type("CannedNode", (CannedNode,), {"routes": routes})
+
+    return Elasticsearch("http://localhost:9200", node_class=node_class, **kwargs)
+
+
+def canned_async_client(
+    routes: List[Tuple[str, str, Response]], **kwargs
+) -> AsyncElasticsearch:
+    """
+    The asyncio counterpart of canned_client()
+    """
+    routes = [(m, p, r if callable(r) else encode(r)) for m, p, r in routes]
+
+    node_class = type("AsyncCannedNode", (AsyncCannedNode,), {"routes": routes})
+
+    return AsyncElasticsearch("http://localhost:9200", node_class=node_class, **kwargs)
+
+
+def search_response(hits: int, index: str = "bench", source_fields: int = 10) -> dict:
+    """
+    Return a search response with the given number of hits, each with source_fields source fields
+    """
+    return {
+        "took": 3,
+        "timed_out": False,
+        "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+        "hits": {
+            "total": {"value": hits, "relation": "eq"},
+            "max_score": 1.0,
+            "hits": [
+                {
+                    "_index": index,
+                    "_id": str(i),
+                    "_score": 1.0,
+                    "_source": {f"field_{f}": f"value {i} {f}" for f in range(source_fields)},
+                }
+                for i in range(hits)
+            ],
+        },
+    }
+
+
+def index_list_response(indexes: int) -> dict:
+    """
+    Return a resolve index response listing the given number of open indexes
+    """
+    return {
+        "indices": [
+            {"name": f"index-{i:06d}", "attributes": ["open"]} for i in range(indexes)
+        ],
+        "aliases": [],
+        "data_streams": [],
+    }
+
+
+def bulk_response(body: bytes) -> bytes:
+    """
+    Build a successful _bulk response with one item per action line of body; only index actions are expected,
+    so every action is followed by a source line
+    """
+    items = body.count(b"\n") // 2
+
+    item = b'{"index":{"_index":"bench","_id":"x","result":"created","status":201}}'
+
+    return b'{"took":1,"errors":false,"items":[' + b",".join([item] * items) + b"]}"
@@ -0,0 +1,366 @@
+import contextlib
+import logging
+import time
+from typing import Optional, Union, Type, AsyncIterator
+
+from elastic_transport import NodeSelector
+from elasticsearch import AsyncElasticsearch
+
+from eswrap import VERSION
+from eswrap.core.client.client import create_async_client
+from eswrap.core.async_es_handler.async_es_handler import (
+    AsyncEsHandler,
+    AsyncEsCursor,
+)
+from eswrap.core.index_list.index_list import RESOLVE_INDEX_PARAMS, IndexList
+from eswrap.core.metrics.metrics import MetricsHook, async_perform_request
+from eswrap.errors.indexes import IndexNotFoundError
+from eswrap.main import BULK_LOAD_SETTINGS
+
+
+class AsyncEsWrap(object):
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 9200,
+        scheme: str = "http",
+        connection_details: list[str] | list[dict] = None,
+        index_refresh_ttl: Optional[float] = 60,
+        metrics: Optional[MetricsHook] = None,
+        client: Optional[AsyncElasticsearch] = None,
+        connections_per_node: Optional[int] = None,
+        http_compress: Optional[bool] = None,
+        sniff_on_start: Optional[bool] = None,
+        sniff_on_node_failure: Optional[bool] = None,
+        node_selector: Union[str, Type[NodeSelector], None] = None,
+        fast_json: Optional[bool] = None,
+        **kwargs,
+    ):
+        """
+        The asyncio counterpart of the EsWrap, built on the AsyncElasticsearch client (requires the
+        'elasticsearch[async]' extra). connection_details are the same as for the EsWrap.
+
+        The index handlers are set up lazily on the first call to get_index_handler() or explicitly by awaiting
+        setup_handlers_for_indexes(), and reloaded when older than index_refresh_ttl seconds. The handlers report
+        every request to the metrics hook, if given.
+
+        The connection pool options and sharing an existing client work as for the EsWrap; only a client created
+        by the AsyncEsWrap itself is closed by close() and on leaving an async with block.
+        """
+        self.__version = VERSION
+        self.__owns_client = False
+
+        self.logger = logging.getLogger(__name__)
+
+        if client is not None:
+            options = (
+                connection_details,
+                connections_per_node,
+                http_compress,
+                sniff_on_start,
+                sniff_on_node_failure,
+                node_selector,
+                fast_json,
+            )
+            if kwargs or any(x is not None for x in options):
+                raise ValueError(
+                    "Connection options cannot be combined with an existing client"
+                )
+
+            self.connection_details = None
+            self.__es_client = client
+        else:
+            if connection_details is None:
+                self.connection_details = [
+                    {"host": host, "port": port, "scheme": scheme}
+                ]
+            else:
+                self.connection_details = connection_details
+
+            self.__es_client = create_async_client(
+                self.connection_details,
+                connections_per_node=connections_per_node,
+                http_compress=http_compress,
+                sniff_on_start=sniff_on_start,
+                sniff_on_node_failure=sniff_on_node_failure,
+                node_selector=node_selector,
+                fast_json=fast_json,
+                **kwargs,
+            )
+            self.__owns_client = True
+
+        self.__index_dict = {}
+        self.__index_refresh_ttl = index_refresh_ttl
+        self.__last_refresh = None
+        self.__metrics = metrics
+        # as for the IndexList: changes made while a refresh awaits the index names are merged into its result
+        self.__version = 0
+        self.__refreshing = 0
+        self.__changes = {}
+
+    @property
+    def es_client(self) -> AsyncElasticsearch:
+        return self.__es_client
+
+    @property
+    def owns_client(self) -> bool:
+        """Property returning whether the client was created (and is closed) by this AsyncEsWrap"""
+        return self.__owns_client
+
+    @property
+    def version(self) -> str:
+        """Property returning current version"""
+        return self.__version
+
+    @property
+    def metrics(self) -> Optional[MetricsHook]:
+        return self.__metrics
+
+    @metrics.setter
+    def metrics(self, val: Optional[MetricsHook]):
+        self.__metrics = val
+
+        for handler in self.index_dict.values():
+            handler.metrics = val
+
+    @property
+    def index_dict(self) -> dict:
+        return self.__index_dict
+
+    @property
+    def stale(self) -> bool:
+        if self.__last_refresh is None:
+            return True
+
+        if self.__index_refresh_ttl is None:
+            return False
+
+        return time.monotonic() - self.__last_refresh > self.__index_refresh_ttl
+
+    async def info(self):
+        return await self.es_client.info()
+
+    async def get_index_handler(self, index_name: str) -> AsyncEsHandler:
+        if self.stale:
+            await self.setup_handlers_for_indexes()
+
+        try:
+            return self.index_dict[index_name]
+        except KeyError:
+            raise IndexNotFoundError
+
+    async def setup_handlers_for_indexes(self):
+        self.__refreshing += 1
+        since = self.__version
+
+        try:
+            try:
+                index_names = IndexList._index_names(
+                    await async_perform_request(
+                        self.metrics,
+                        self.es_client.transport.serializers.get_serializer(
+                            "application/json"
+                        ),
+                        "resolve_index",
+                        "*",
+                        self.es_client.indices.resolve_index,
+                        **RESOLVE_INDEX_PARAMS,
+                    )
+                )
+            except Exception as err:
+                self.logger.error(f"Uncaught exception encountered: {err}")
+                return
+
+            index_dict = IndexList._refreshed(
+                self.index_dict, index_names, self.__handler
+            )
+
+            # the index names were listed before the changes made while awaiting them
+            for index_name, (version, handler) in self.__changes.items():
+                if version <= since:
+                    continue
+
+                if handler is None:
+                    index_dict.pop(index_name, None)
+                else:
+                    index_dict[index_name] = handler
+
+            self.__index_dict = index_dict
+            self.__last_refresh = time.monotonic()
+        finally:
+            self.__refreshing -= 1
+
+            if not self.__refreshing:
+                self.__changes = {}
+
+    def __handler(self, index_name: str) -> AsyncEsHandler:
+        return AsyncEsHandler(
+            es_connection=self.es_client, index=index_name, metrics=self.metrics
+        )
+
+    def __add_index(
+        self, index_name: str, handler: Optional[AsyncEsHandler] = None
+    ) -> None:
+        if index_name not in self.index_dict:
+            self.index_dict[index_name] = handler or self.__handler(index_name)
+            self.__changed(index_name, self.index_dict[index_name])
+
+    def __remove_index(self, index_name: str) -> None:
+        self.index_dict.pop(index_name, None)
+        # also when not registered; a running refresh may have listed it before it was deleted
+        self.__changed(index_name, None)
+
+    def __changed(self, index_name: str, handler: Optional[AsyncEsHandler]) -> None:
+        # handler is None for a removed index
+        self.__version += 1
+
+        if self.__refreshing:
+            self.__changes[index_name] = (self.__version, handler)
+
+    async def index(self, index_name: str, data: dict, doc_id: Optional[str] = None):
+
+        handler = self.index_dict.get(index_name) or self.__handler(index_name)
+
+        ret_data = await handler.upsert(data, doc_id)
+
+        # only registered once the write succeeded; it raises if the index does not exist and cannot be created
+        self.__add_index(index_name, handler)
+
+        return ret_data
+
+    async def search(self, index_name: str) -> AsyncEsCursor:
+
+        return (await self.get_index_handler(index_name)).search()
+
+    async def delete_index(self, index_name: str):
+
+        ret_val = await self.es_client.options(
+            ignore_status=[400, 404]
+        ).indices.delete(index=index_name)
+
+        try:
+            if ret_val["acknowledged"]:
+                if any(x in index_name for x in "*,"):
+                    await self.setup_handlers_for_indexes()
+                else:
+                    self.__remove_index(index_name)
+                return True
+        except KeyError:
+            # failed somehow, assuming the given index does not exist
+            self.logger.warning(
+                f"The index {index_name} cannot not be deleted; reason -> {ret_val}"
+            )
+        except Exception as err:
+            self.logger.error(f"Uncaught exception encountered: {err}")
+
+        return False
+
+    async def create_index(
+        self,
+        index_name: str,
+        mappings: Optional[dict] = None,
+        settings: Optional[dict] = None,
+        **kwargs,
+    ):
+        """
+        Create the index with the given mappings and settings; see EsWrap.create_index
+        """
+        if mappings is not None:
+            kwargs["mappings"] = mappings
+
+        if settings is not None:
+            kwargs["settings"] = settings
+
+        ret_val = await self.es_client.options(
+            ignore_status=[400, 404]
+        ).indices.create(index=index_name, **kwargs)
+
+        try:
+            if ret_val["acknowledged"]:
+                self.__add_index(index_name)
+                return True
+        except KeyError:
+            # failed somehow, assuming the given index does not exist
+            self.logger.warning(
+                f"The index {index_name} cannot not be created; reason -> {ret_val}"
+            )
+        except Exception as err:
+            self.logger.error(f"Uncaught exception encountered: {err}")
+
+        return False
+
+    @contextlib.asynccontextmanager
+    async def bulk_load(
+        self, index_name: str, replicas: int = 0, refresh_interval: str = "-1"
+    ) -> AsyncIterator[AsyncEsHandler]:
+        """
+        The asyncio counterpart of EsWrap.bulk_load:
+
+            async with es.bulk_load("products") as handler:
+                ...
+        """
+        handler = await self.get_index_handler(index_name)
+
+        original = {
+            name: {x: index["settings"].get(x) for x in BULK_LOAD_SETTINGS}
+            for name, index in (
+                await self.es_client.indices.get_settings(
+                    index=index_name, name=list(BULK_LOAD_SETTINGS), flat_settings=True
+                )
+            ).items()
+        }
+
+        await self.es_client.indices.put_settings(
+            index=index_name,
+            settings={
+                "index.refresh_interval": refresh_interval,
+                "index.number_of_replicas": replicas,
+            },
+        )
+
+        body_failed = True
+        try:
+            yield handler
+            body_failed = False
+        finally:
+            # every index is restored and refreshed, even if restoring another one failed
+            restore_error = None
+
+            for name, settings in original.items():
+                try:
+                    await self.es_client.indices.put_settings(
+                        index=name, settings=settings
+                    )
+                except Exception as err:
+                    self.logger.error(f"Could not restore the settings of {name}: {err}")
+                    restore_error = restore_error or err
+
+            try:
+                await self.es_client.indices.refresh(index=index_name)
+            except Exception as err:
+                self.logger.error(f"Could not refresh {index_name}: {err}")
+                restore_error = restore_error or err
+
+            handler.invalidate_cache()
+
+            # an error of the with block takes precedence
+            if restore_error is not None and not body_failed:
+                raise restore_error
+
+    async def close(self):
+        """
+        Close the client if it was created by this AsyncEsWrap; a shared client is left open for its owner
+        """
+        if self.__owns_client:
+            self.__owns_client = False
+            await self.es_client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __repr__(self):
+        """String representation of object"""
+        return "<< AsyncEsWrap:{} >>".format(self.version)
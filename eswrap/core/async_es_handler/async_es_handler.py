@@ -0,0 +1,511 @@
+import asyncio
+import collections
+import logging
+from typing import Optional, AsyncIterator, Callable, Union, Iterable, List, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+from eswrap.core.es_handler.es_handler import EsHandler
+from eswrap.core.es_query.es_query import EsQuery
+from eswrap.core.es_task.es_task import AsyncEsTask
+from eswrap.core.hit.hit import Hit
+from eswrap.core.metrics.metrics import (
+    METRICS_FILTER_PATH,
+    MetricsHook,
+    async_perform_request,
+)
+from eswrap.core.query_cache.query_cache import QueryCache
+
+
+class AsyncEsHandler(object):
+    """
+    The AsyncEsHandler; the asyncio counterpart of the EsHandler
+    """
+
+    def __init__(
+        self,
+        es_connection: AsyncElasticsearch,
+        index: str,
+        cache: Optional[QueryCache] = None,
+        metrics: Optional[MetricsHook] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+
+        self.es_connection = es_connection
+        self.index = index
+        self.cache = cache
+        self.metrics = metrics
+
+    @property
+    def cache_stats(self) -> Optional[dict]:
+        return self.cache.stats if self.cache is not None else None
+
+    def enable_cache(self, max_size: int = 1024, ttl: Optional[float] = 60):
+        """
+        Cache the results of AsyncEsCursor.search() for this index; see EsHandler.enable_cache
+        """
+        self.cache = QueryCache(max_size=max_size, ttl=ttl)
+
+        return self.cache
+
+    def disable_cache(self):
+        self.cache = None
+
+    def invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    async def _perform(self, operation: str, api: Callable, **kwargs):
+        """
+        Await the client api with kwargs, reporting the request to the metrics hook (if set)
+        """
+        if self.metrics is None:
+            return await api(**kwargs)
+
+        return await async_perform_request(
+            self.metrics,
+            self.es_connection.transport.serializers.get_serializer("application/json"),
+            operation,
+            self.index,
+            api,
+            **kwargs,
+        )
+
+    def search(self):
+        """
+        Search the index.
+        """
+        return AsyncEsCursor(self)
+
+    async def count(self, filter_data: dict = None, **kwargs):
+        """
+        Count the number of records in the query
+        """
+        data = EsHandler._count_body(filter_data, kwargs)
+
+        return (
+            await self._perform(
+                "count", self.es_connection.count, index=self.index, body=data, **kwargs
+            )
+        )["count"]
+
+    async def get_many(
+        self,
+        ids: Iterable[str],
+        fields: Optional[List[str]] = None,
+        chunk_size: int = 1000,
+        workers: int = 1,
+        **kwargs,
+    ) -> AsyncIterator[Tuple[str, Optional[dict]]]:
+        """
+        Async generator fetching documents by id through the _mget api, yielding (id, document) tuples in the
+        order of ids; workers chunks are requested concurrently. See EsHandler.get_many
+        """
+        chunks = EsHandler._mget_chunks(ids, fields, chunk_size, workers, kwargs)
+
+        pending = collections.deque()
+
+        try:
+            for chunk in chunks:
+                pending.append(asyncio.ensure_future(self.__get_chunk(chunk, kwargs)))
+
+                if len(pending) >= workers:
+                    for x in await pending.popleft():
+                        yield x
+
+            while pending:
+                for x in await pending.popleft():
+                    yield x
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def __get_chunk(
+        self, chunk: list, kwargs: dict
+    ) -> List[Tuple[str, Optional[dict]]]:
+        results = await self._perform(
+            "mget", self.es_connection.mget, index=self.index, ids=chunk, **kwargs
+        )
+
+        return EsHandler._parse_mget(self.index, chunk, results, self.logger)
+
+    async def upsert(self, document: dict, doc_id: Optional[str] = None, **kwargs):
+        """ """
+        if doc_id is None:
+            ret_data = await self._perform(
+                "index",
+                self.es_connection.index,
+                index=self.index,
+                document=document,
+                **kwargs,
+            )
+        else:
+            ret_data = await self._perform(
+                "index",
+                self.es_connection.index,
+                index=self.index,
+                id=doc_id,
+                document=document,
+                **kwargs,
+            )
+
+        self.invalidate_cache()
+
+        return ret_data
+
+    async def update(
+        self,
+        doc_id: str,
+        partial: Optional[dict] = None,
+        script: Union[str, dict, None] = None,
+        upsert: Optional[dict] = None,
+        retry_on_conflict: Optional[int] = None,
+        detect_noop: Optional[bool] = None,
+        if_seq_no: Optional[int] = None,
+        if_primary_term: Optional[int] = None,
+        **kwargs,
+    ):
+        """
+        Update a single document in place with a partial document or a script; see EsHandler.update
+        """
+        kwargs.update(
+            EsHandler._update_params(
+                partial,
+                script,
+                upsert,
+                retry_on_conflict,
+                detect_noop,
+                if_seq_no,
+                if_primary_term,
+            )
+        )
+
+        ret_data = await self._perform(
+            "update", self.es_connection.update, index=self.index, id=doc_id, **kwargs
+        )
+
+        self.invalidate_cache()
+
+        return ret_data
+
+    async def delete(self, doc_id: str, **kwargs):
+        ret_data = await self._perform(
+            "delete", self.es_connection.delete, index=self.index, id=doc_id, **kwargs
+        )
+
+        self.invalidate_cache()
+
+        return ret_data
+
+    async def delete_by_query(
+        self,
+        filter_data: Union[dict, EsQuery],
+        slices: Union[int, str, None] = None,
+        wait_for_completion: bool = True,
+        requests_per_second: Optional[float] = None,
+        **kwargs,
+    ) -> Union[dict, AsyncEsTask]:
+        """
+        Delete the documents matching filter_data; see EsHandler.delete_by_query
+        """
+        return await self.__by_query(
+            "delete_by_query",
+            EsHandler._by_query_body(filter_data),
+            slices,
+            wait_for_completion,
+            requests_per_second,
+            kwargs,
+        )
+
+    async def update_by_query(
+        self,
+        filter_data: Union[dict, EsQuery, None] = None,
+        script: Union[str, dict, None] = None,
+        slices: Union[int, str, None] = None,
+        wait_for_completion: bool = True,
+        requests_per_second: Optional[float] = None,
+        **kwargs,
+    ) -> Union[dict, AsyncEsTask]:
+        """
+        Update the documents matching filter_data with script; see EsHandler.update_by_query
+        """
+        return await self.__by_query(
+            "update_by_query",
+            EsHandler._by_query_body(filter_data, script),
+            slices,
+            wait_for_completion,
+            requests_per_second,
+            kwargs,
+        )
+
+    async def __by_query(
+        self,
+        action: str,
+        body: dict,
+        slices: Union[int, str, None],
+        wait_for_completion: bool,
+        requests_per_second: Optional[float],
+        kwargs: dict,
+    ) -> Union[dict, AsyncEsTask]:
+        EsHandler._by_query_params(
+            slices, wait_for_completion, requests_per_second, kwargs
+        )
+
+        ret_data = await self._perform(
+            action,
+            getattr(self.es_connection, action),
+            index=self.index,
+            body=body,
+            **kwargs,
+        )
+
+        self.invalidate_cache()
+
+        if not wait_for_completion:
+            return AsyncEsTask(self, ret_data["task"], action)
+
+        return ret_data
+
+    def __repr__(self):
+        """return a string representation of the obj AsyncEsHandler"""
+        return "<< AsyncEsHandler: {} >>".format(self.index)
+
+
+class AsyncEsCursor(EsQuery):
+    """
+    The AsyncEsCursor; the asyncio counterpart of the EsCursor
+    """
+
+    def __init__(
+        self,
+        es_handler: AsyncEsHandler,
+        limit: int = 10,
+        skip: int = None,
+        sort: list = None,
+        **kwargs,
+    ):
+        """
+        Create a new AsyncEsCursor object.
+
+        :param es_handler: AsyncEsHandler object
+        :type es_handler: AsyncEsHandler
+        """
+
+        self.logger = logging.getLogger(__name__)
+
+        self.__es_handler = es_handler
+
+        super().__init__(limit=limit, skip=skip, sort=sort, **kwargs)
+
+    @property
+    def es_handler(self) -> AsyncEsHandler:
+        return self.__es_handler
+
+    def __repr__(self):
+        """return a string representation of the obj AsyncEsCursor"""
+        return "<<AsyncEsCursor: {}>>".format(self.es_handler.index)
+
+    def _filter_path(self, paths: tuple) -> Optional[list]:
+        filter_path = super()._filter_path(paths)
+
+        # keep the fields the metrics hook reads
+        if filter_path is not None and self.es_handler.metrics is not None:
+            filter_path.extend(METRICS_FILTER_PATH)
+
+        return filter_path
+
+    async def __fetch_results(self, body: dict, filter_path: tuple):
+        return await self.es_handler._perform(
+            "search",
+            self.es_handler.es_connection.search,
+            index=self.es_handler.index,
+            body=body,
+            filter_path=self._filter_path(filter_path),
+        )
+
+    async def search(self):
+
+        body = self._search_body()
+
+        cache = self.es_handler.cache
+
+        if cache is not None:
+            cache_key = self.body_key
+            hit, ret_dict = cache.get(cache_key)
+            if hit:
+                return dict(ret_dict)
+            generation = cache.generation
+
+        results = await self.__fetch_results(body, self.SEARCH_FILTER_PATH)
+
+        ret_dict = self._parse_search_results(results)
+
+        if cache is not None:
+            cache.set(cache_key, ret_dict, generation)
+            return dict(ret_dict)
+
+        return ret_dict
+
+    async def count(self, **kwargs) -> int:
+        """
+        Return the exact number of documents matching the query of this cursor; see EsCursor.count
+        """
+        return (
+            await self.es_handler._perform(
+                "count",
+                self.es_handler.es_connection.count,
+                index=self.es_handler.index,
+                body=self._count_body(),
+                **kwargs,
+            )
+        )["count"]
+
+    async def profile(self, **kwargs) -> dict:
+        """
+        Run the search of this cursor with profiling enabled and return a per shard timing summary; see
+        EsCursor.profile
+        """
+        results = await self.es_handler._perform(
+            "search",
+            self.es_handler.es_connection.search,
+            index=self.es_handler.index,
+            body=self._profile_body(),
+            filter_path=self._filter_path(("took", "profile")),
+            **kwargs,
+        )
+
+        return self._parse_profile(results)
+
+    async def aggregate(self, **kwargs) -> dict:
+        """
+        Run the added aggregations on the documents matching the query; see EsCursor.aggregate
+        """
+        results = await self.es_handler._perform(
+            "search",
+            self.es_handler.es_connection.search,
+            index=self.es_handler.index,
+            body=self._aggregation_body(),
+            filter_path=self._filter_path(("aggregations",)),
+            **kwargs,
+        )
+
+        return results.get("aggregations", {})
+
+    async def composite(
+        self, sources, size: int = 1000, name: str = "composite", **kwargs
+    ) -> AsyncIterator[dict]:
+        """
+        Async generator yielding every bucket of a composite aggregation; see EsCursor.composite
+        """
+        after = None
+
+        while True:
+            results = await self.es_handler._perform(
+                "search",
+                self.es_handler.es_connection.search,
+                index=self.es_handler.index,
+                body=self._aggregation_body(
+                    {name: self._composite_aggregation(sources, size, after)}
+                ),
+                filter_path=self._filter_path(
+                    (f"aggregations.{name}.buckets", f"aggregations.{name}.after_key")
+                ),
+                **kwargs,
+            )
+
+            aggregation = results.get("aggregations", {}).get(name, {})
+            buckets = aggregation.get("buckets", [])
+
+            for bucket in buckets:
+                yield bucket
+
+            after = aggregation.get("after_key")
+
+            if not buckets or after is None:
+                break
+
+    async def execute(self) -> list:
+        """
+        Fetch a single page of results from Elasticsearch
+        """
+
+        results = await self.__fetch_results(
+            self._search_body(), self.HITS_FILTER_PATH
+        )
+
+        if isinstance(results, str):
+            return []
+
+        return self._parse_hits(results.get("hits", {}).get("hits", []))
+
+    async def iter_hits(self) -> AsyncIterator[Hit]:
+        """
+        Fetch a single page of results and yield them in order as Hit views; see EsCursor.iter_hits
+        """
+        results = await self.__fetch_results(
+            self._search_body(), self.HIT_VIEW_FILTER_PATH
+        )
+
+        for hit in results.get("hits", {}).get("hits", []):
+            yield Hit(hit)
+
+    async def stream(
+        self, page_size: int = 1000, keep_alive: str = "1m"
+    ) -> AsyncIterator[dict]:
+        """
+        Async generator walking the complete result set of the query with a point in time and search_after; see
+        EsCursor.stream
+        """
+
+        body = self._stream_body(page_size)
+
+        pit_id = (
+            await self.es_handler._perform(
+                "open_point_in_time",
+                self.es_handler.es_connection.open_point_in_time,
+                index=self.es_handler.index,
+                keep_alive=keep_alive,
+            )
+        )["id"]
+
+        try:
+            while True:
+                body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+
+                results = await self.es_handler._perform(
+                    "search",
+                    self.es_handler.es_connection.search,
+                    body=body,
+                    filter_path=self._filter_path(self.STREAM_FILTER_PATH),
+                )
+
+                pit_id = results.get("pit_id", pit_id)
+                hits = results.get("hits", {}).get("hits", [])
+
+                for x in self._parse_hits(hits):
+                    yield x
+
+                if len(hits) < page_size:
+                    break
+
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            try:
+                await self.es_handler._perform(
+                    "close_point_in_time",
+                    self.es_handler.es_connection.close_point_in_time,
+                    id=pit_id,
+                )
+            except Exception as err:
+                # the pit will expire on its own after keep_alive
+                self.logger.warning(
+                    f"Could not close point in time for {self.es_handler.index}: {err}"
+                )
+
+    async def __results(self) -> AsyncIterator[dict]:
+        for x in await self.execute():
+            yield x
+
+    def __aiter__(self):
+        """Iterate over a single page of results (limit and skip applied) in order"""
+        return self.__results()
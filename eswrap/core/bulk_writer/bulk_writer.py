@@ -0,0 +1,167 @@
+import logging
+from typing import Iterable, Iterator, Optional, Tuple
+
+from elasticsearch import Elasticsearch
+
+from eswrap.core.metrics.metrics import MetricsHook, perform_request
+
+# action meta fields which can be given as part of a document, mapped to their key in the action line; these are
+# moved into the action line of the bulk request and stripped from the document source
+META_FIELDS = {
+    "_id": "_id",
+    "_index": "_index",
+    "_routing": "routing",
+    "_op_type": None,
+    "_if_seq_no": "if_seq_no",
+    "_if_primary_term": "if_primary_term",
+    "_retry_on_conflict": "retry_on_conflict",
+}
+
+
+class BulkWriter(object):
+    """
+    The BulkWriter; streams documents into the _bulk api in chunks capped by both document count and payload size
+    """
+
+    def __init__(
+        self,
+        es_connection: Elasticsearch,
+        index: str,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        op_type: str = "index",
+        metrics: Optional[MetricsHook] = None,
+    ):
+        """
+        Create a new BulkWriter object.
+
+        :param es_connection: Elasticsearch client
+        :type es_connection: Elasticsearch
+        :param index: Default index for all actions without an '_index' meta field
+        :type index: str
+        :param chunk_size: Maximum number of documents per bulk request
+        :type chunk_size: int
+        :param max_chunk_bytes: Maximum payload size in bytes per bulk request
+        :type max_chunk_bytes: int
+        :param op_type: Default operation for all actions without an '_op_type' meta field
+        :type op_type: str
+        :param metrics: Hook to report every bulk request to
+        :type metrics: MetricsHook
+        """
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+
+        if not isinstance(max_chunk_bytes, int) or max_chunk_bytes < 1:
+            raise ValueError("max_chunk_bytes must be a positive integer")
+
+        self.logger = logging.getLogger(__name__)
+
+        self.es_connection = es_connection
+        self.index = index
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.op_type = op_type
+        self.metrics = metrics
+
+        self.__serializer = es_connection.transport.serializers.get_serializer(
+            "application/json"
+        )
+
+    def expand_action(self, document: dict) -> Tuple[dict, dict]:
+        """
+        Split a document into the action line and the source line of a bulk request
+        """
+        if not any(x in document for x in META_FIELDS):
+            return {self.op_type: {"_index": self.index}}, document
+
+        source = dict(document)
+
+        op_type = source.pop("_op_type", self.op_type)
+        action = {"_index": source.pop("_index", self.index)}
+
+        for field, key in META_FIELDS.items():
+            if key is not None and field in source:
+                action[key] = source.pop(field)
+
+        return {op_type: action}, source
+
+    def chunk_actions(self, documents: Iterable[dict]) -> Iterator[list]:
+        """
+        Serialize the documents and group them into chunks; only a single chunk is held in memory at a time
+        """
+        chunk = []
+        chunk_bytes = 0
+
+        for document in documents:
+            action, source = self.expand_action(document)
+
+            data = [self.__serializer.dumps(action)]
+            if "delete" not in action:
+                data.append(self.__serializer.dumps(source))
+
+            # account for the newline after each line
+            size = sum(len(x) + 1 for x in data)
+
+            if chunk and (
+                len(chunk) >= self.chunk_size or chunk_bytes + size > self.max_chunk_bytes
+            ):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+
+            chunk.append(data)
+            chunk_bytes += size
+
+        if chunk:
+            yield chunk
+
+    def send_chunk(self, chunk: list, **kwargs) -> Iterator[Tuple[bool, dict]]:
+        """
+        Send a single chunk to the _bulk api and yield a (success, item) tuple per document
+        """
+        operations = [line for data in chunk for line in data]
+
+        results = perform_request(
+            self.metrics,
+            self.__serializer,
+            "bulk",
+            self.index,
+            self.es_connection.bulk,
+            operations=operations,
+            **kwargs,
+        )
+
+        for item in results["items"]:
+            info = next(iter(item.values()))
+            yield 200 <= info.get("status", 500) < 300, item
+
+    def stream(self, documents: Iterable[dict], **kwargs) -> Iterator[Tuple[bool, dict]]:
+        """
+        Write the documents and yield a (success, item) tuple per document in input order
+        """
+        for chunk in self.chunk_actions(documents):
+            yield from self.send_chunk(chunk, **kwargs)
+
+    def write(self, documents: Iterable[dict], **kwargs) -> dict:
+        """
+        Write the documents and return a summary of the successful and failed items
+        """
+        ret_dict = {"success": 0, "failed": 0, "errors": []}
+
+        for ok, item in self.stream(documents, **kwargs):
+            if ok:
+                ret_dict["success"] += 1
+            else:
+                ret_dict["failed"] += 1
+                ret_dict["errors"].append(item)
+
+        if ret_dict["failed"] > 0:
+            self.logger.warning(
+                f"Bulk write to {self.index} finished with {ret_dict['failed']} failed item(s)"
+            )
+
+        return ret_dict
+
+    def __repr__(self):
+        """return a string representation of the obj BulkWriter"""
+        return "<< BulkWriter: {} >>".format(self.index)
@@ -0,0 +1,158 @@
+import itertools
+import logging
+from typing import Optional, Sequence, Type, Union
+
+from elastic_transport import BaseNode, NodeSelector
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+logger = logging.getLogger(__name__)
+
+
+class LeastConnectionsSelector(NodeSelector):
+    """
+    Select the live node with the fewest connections in use, rotating between equally loaded nodes. The load is
+    read from the connection pool of the urllib3 node; for nodes without a readable pool (e.g. the aiohttp node)
+    this falls back to round robin.
+    """
+
+    def __init__(self, node_configs):
+        super().__init__(node_configs)
+
+        self.__counter = itertools.count()
+
+    @staticmethod
+    def in_use(node: BaseNode) -> Optional[int]:
+        """
+        Return the number of connections of the node currently checked out of its pool, None if unknown
+        """
+        connections = getattr(getattr(node, "pool", None), "pool", None)
+
+        if connections is None:
+            return None
+
+        # the pool blocks at maxsize and holds the connections (or empty slots) not in use
+        return connections.maxsize - connections.qsize()
+
+    def select(self, nodes: Sequence[BaseNode]) -> BaseNode:
+        start = next(self.__counter) % len(nodes)
+
+        best = best_load = None
+
+        for i in range(len(nodes)):
+            node = nodes[(start + i) % len(nodes)]
+            load = self.in_use(node)
+
+            if load is None:
+                return nodes[start]
+
+            if best is None or load < best_load:
+                best, best_load = node, load
+
+            if load == 0:
+                break
+
+        return best
+
+
+# node selection strategies accepted by create_client(); a NodeSelector subclass can be given as well
+NODE_SELECTORS = {
+    "round_robin": "round_robin",
+    "random": "random",
+    "least_connections": LeastConnectionsSelector,
+}
+
+
+def client_options(
+    connections_per_node: Optional[int] = None,
+    http_compress: Optional[bool] = None,
+    sniff_on_start: Optional[bool] = None,
+    sniff_on_node_failure: Optional[bool] = None,
+    node_selector: Union[str, Type[NodeSelector], None] = None,
+    fast_json: Optional[bool] = None,
+    **kwargs,
+) -> dict:
+    """
+    Return the client kwargs for the given pool, sniffing and serializer options; options left to None keep the
+    client defaults (10 connections per node, no compression, no sniffing, round robin, stdlib json). fast_json
+    encodes and decodes json with orjson, if installed (the 'orjson' extra).
+    """
+    options = {
+        "connections_per_node": connections_per_node,
+        "http_compress": http_compress,
+        "sniff_on_start": sniff_on_start,
+        "sniff_on_node_failure": sniff_on_node_failure,
+    }
+
+    if connections_per_node is not None and (
+        not isinstance(connections_per_node, int) or connections_per_node < 1
+    ):
+        raise ValueError("connections_per_node must be a positive integer")
+
+    if node_selector is not None:
+        if isinstance(node_selector, str):
+            try:
+                node_selector = NODE_SELECTORS[node_selector]
+            except KeyError:
+                raise ValueError(
+                    f"Unknown node_selector {node_selector!r}; use one of {', '.join(NODE_SELECTORS)}"
+                )
+
+        options["node_selector_class"] = node_selector
+
+    if fast_json and "serializer" not in kwargs and "serializers" not in kwargs:
+        options["serializer"] = fast_json_serializer()
+
+    options = {k: v for k, v in options.items() if v is not None}
+    options.update(kwargs)
+
+    return options
+
+
+def fast_json_serializer():
+    """
+    Return an orjson based json serializer, or None (the default serializer is used) if orjson is not installed
+    """
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        logger.warning("orjson is not installed; falling back to the default json serializer")
+        return None
+
+    try:
+        from elasticsearch.serializer import OrjsonSerializer
+    except ImportError:
+        logger.warning(
+            "The installed elasticsearch client has no orjson serializer; falling back to the default json "
+            "serializer"
+        )
+        return None
+
+    return OrjsonSerializer()
+
+
+def create_client(connection_details: Union[list, str, None] = None, **kwargs) -> Elasticsearch:
+    """
+    Create an Elasticsearch client with pooled, persistent connections. The pool and sniffing options are those
+    of client_options(); all other kwargs are passed on to the client. A single client is thread safe and can be
+    shared by several EsWrap objects with EsWrap(client=...); the creator owns and closes it.
+
+        client = create_client(
+            ["http://node1:9200", "http://node2:9200"],
+            connections_per_node=32,
+            http_compress=True,
+            sniff_on_start=True,
+            sniff_on_node_failure=True,
+            node_selector="least_connections",
+            fast_json=True,
+        )
+    """
+    return Elasticsearch(connection_details, **client_options(**kwargs))
+
+
+def create_async_client(
+    connection_details: Union[list, str, None] = None, **kwargs
+) -> AsyncElasticsearch:
+    """
+    The asyncio counterpart of create_client (requires the 'elasticsearch[async]' extra)
+    """
+    return AsyncElasticsearch(connection_details, **client_options(**kwargs))
@@ -1,9 +1,26 @@
 import collections
-from typing import Optional
+import itertools
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterable, Iterator, Tuple, Callable, Union, List
 
 from elasticsearch import Elasticsearch
 
-from eswrap.errors.queries import QueryTypeNotSupportedError
+from eswrap.core.bulk_writer.bulk_writer import BulkWriter
+from eswrap.core.es_query.es_query import EsQuery
+from eswrap.core.es_task.es_task import EsTask
+from eswrap.core.file_exporter.file_exporter import FileExporter
+from eswrap.core.hit.hit import Hit
+from eswrap.core.metrics.metrics import (
+    METRICS_FILTER_PATH,
+    MetricsHook,
+    perform_request,
+)
+from eswrap.core.query_cache.query_cache import QueryCache
+from eswrap.core.write_controller.write_controller import WriteController
 
 
 class EsHandler(object):
@@ -11,9 +28,88 @@ class EsHandler(object):
     The EsHandler
     """
 
-    def __init__(self, es_connection: Elasticsearch, index: str):
+    def __init__(
+        self,
+        es_connection: Elasticsearch,
+        index: str,
+        cache: Optional[QueryCache] = None,
+        metrics: Optional[MetricsHook] = None,
+        write_controller: Optional[WriteController] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+
         self.es_connection = es_connection
         self.index = index
+        self.cache = cache
+        self.metrics = metrics
+        self.write_controller = write_controller
+
+    @property
+    def write_controller(self) -> Optional[WriteController]:
+        return self.__write_controller
+
+    @write_controller.setter
+    def write_controller(self, val: Optional[WriteController]):
+        self.__write_controller = val
+        # made once; options() creates a new client on every call
+        self.__write_connection = (
+            self.es_connection if val is None else val.client(self.es_connection)
+        )
+
+    @property
+    def cache_stats(self) -> Optional[dict]:
+        return self.cache.stats if self.cache is not None else None
+
+    def enable_cache(self, max_size: int = 1024, ttl: Optional[float] = 60):
+        """
+        Cache the results of EsCursor.search() for this index; results are evicted least recently used first,
+        after ttl seconds, and on every write through this handler. Cached results are shared between callers
+        and should be treated as read only.
+        """
+        self.cache = QueryCache(max_size=max_size, ttl=ttl)
+
+        return self.cache
+
+    def disable_cache(self):
+        self.cache = None
+
+    def invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def _perform(self, operation: str, api: Callable, **kwargs):
+        """
+        Call the client api with kwargs, reporting the request to the metrics hook (if set)
+        """
+        if self.metrics is None:
+            return api(**kwargs)
+
+        return perform_request(
+            self.metrics,
+            self.es_connection.transport.serializers.get_serializer("application/json"),
+            operation,
+            self.index,
+            api,
+            **kwargs,
+        )
+
+    @property
+    def write_connection(self) -> Elasticsearch:
+        """
+        The client to write with; with a write controller set, rejections of the cluster (429/503) are not
+        retried by the client itself but left to the controller
+        """
+        return self.__write_connection
+
+    def _write(self, operation: str, api: Callable, **kwargs):
+        """
+        Same as _perform, for writes; retried with backoff by the write controller (if set) while the cluster
+        rejects them. api should be a method of write_connection.
+        """
+        if self.write_controller is None:
+            return self._perform(operation, api, **kwargs)
+
+        return self.write_controller.call(self._perform, operation, api, **kwargs)
 
     def search(self):
         """
@@ -25,6 +121,17 @@ class EsHandler(object):
         """
         Count the number of records in the query
         """
+        data = self._count_body(filter_data, kwargs)
+
+        return self._perform(
+            "count", self.es_connection.count, index=self.index, body=data, **kwargs
+        )["count"]
+
+    @staticmethod
+    def _count_body(filter_data: dict, kwargs: dict) -> dict:
+        """
+        Build the body of a count request; the 'regexp' and 'bool_query' flags are popped from the given kwargs
+        """
         if filter_data is None:
             data = {"query": {"match_all": {}}}
         else:
@@ -43,81 +150,595 @@ class EsHandler(object):
             else:
                 data = {"query": {"match": filter_data}}
 
-        return self.es_connection.count(index=self.index, body=data, **kwargs)["count"]
+        return data
+
+    def get_many(
+        self,
+        ids: Iterable[str],
+        fields: Optional[List[str]] = None,
+        chunk_size: int = 1000,
+        workers: int = 1,
+        **kwargs,
+    ) -> Iterator[Tuple[str, Optional[dict]]]:
+        """
+        Generator fetching documents by id through the _mget api; yields an (id, document) tuple per id, in the
+        order of ids, with None as document for ids which do not exist. ids can be any iterable (e.g. a generator)
+        and are sent in chunks of chunk_size; with workers > 1 that many chunks are fetched concurrently, while the
+        results are still yielded in order. fields restricts the returned _source to the given fields (wildcards
+        allowed); an empty list returns no source at all.
+        """
+        chunks = self._mget_chunks(ids, fields, chunk_size, workers, kwargs)
+
+        if workers == 1:
+            for chunk in chunks:
+                yield from self.__get_chunk(chunk, kwargs)
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"eswrap-mget-{self.index}"
+        ) as executor:
+            # keep at most two chunks per worker in flight, so ids are consumed lazily
+            pending = collections.deque()
+
+            try:
+                for chunk in chunks:
+                    pending.append(executor.submit(self.__get_chunk, chunk, kwargs))
+
+                    if len(pending) >= workers * 2:
+                        yield from pending.popleft().result()
+
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    @staticmethod
+    def _mget_chunks(
+        ids: Iterable[str],
+        fields: Optional[List[str]],
+        chunk_size: int,
+        workers: int,
+        kwargs: dict,
+    ) -> Iterator[list]:
+        """
+        Validate the arguments of get_many, add the mget api kwargs for fields to the given kwargs and return an
+        iterator over the chunks of ids
+        """
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+
+        if fields is not None:
+            if fields:
+                kwargs["source_includes"] = list(fields)
+            else:
+                kwargs["source"] = False
+
+        kwargs.setdefault(
+            "filter_path", ["docs._id", "docs.found", "docs._source", "docs.error"]
+        )
+
+        ids = iter(ids)
+
+        return iter(lambda: list(itertools.islice(ids, chunk_size)), [])
+
+    @staticmethod
+    def _parse_mget(
+        index: str, chunk: list, results: dict, logger: logging.Logger
+    ) -> List[Tuple[str, Optional[dict]]]:
+        """
+        Return an (id, document) tuple per id of the chunk from the mget response; errors are logged to logger
+        """
+        ret_list = []
+        for doc_id, doc in zip(chunk, results.get("docs", [])):
+            if "error" in doc:
+                logger.warning(
+                    f"Could not get document {doc_id} from {index}: {doc['error']}"
+                )
+
+            ret_list.append(
+                (doc_id, doc.get("_source", {}) if doc.get("found") else None)
+            )
+
+        return ret_list
+
+    def __get_chunk(self, chunk: list, kwargs: dict) -> List[Tuple[str, Optional[dict]]]:
+        results = self._perform(
+            "mget", self.es_connection.mget, index=self.index, ids=chunk, **kwargs
+        )
+
+        return self._parse_mget(self.index, chunk, results, self.logger)
 
     def upsert(self, document: dict, doc_id: Optional[str] = None, **kwargs):
         """ """
         if doc_id is None:
-            return self.es_connection.index(
-                index=self.index, document=document, **kwargs
+            ret_data = self._write(
+                "index",
+                self.write_connection.index,
+                index=self.index,
+                document=document,
+                **kwargs,
             )
         else:
-            return self.es_connection.index(
-                index=self.index, id=doc_id, document=document, **kwargs
+            ret_data = self._write(
+                "index",
+                self.write_connection.index,
+                index=self.index,
+                id=doc_id,
+                document=document,
+                **kwargs,
             )
 
+        self.invalidate_cache()
+
+        return ret_data
+
+    def update(
+        self,
+        doc_id: str,
+        partial: Optional[dict] = None,
+        script: Union[str, dict, None] = None,
+        upsert: Optional[dict] = None,
+        retry_on_conflict: Optional[int] = None,
+        detect_noop: Optional[bool] = None,
+        if_seq_no: Optional[int] = None,
+        if_primary_term: Optional[int] = None,
+        **kwargs,
+    ):
+        """
+        Update a single document in place; only the partial document (merged into the stored one) or the script (a
+        painless source string or a script dict) is sent, not the whole document.
+
+        upsert is indexed when the document does not exist yet. retry_on_conflict retries the update on version
+        conflicts; if_seq_no/if_primary_term make the update conditional on the document being unchanged since
+        it was read (optimistic concurrency) and cannot be combined with retry_on_conflict. detect_noop=False
+        forces a write even if the partial document changes nothing.
+        """
+        kwargs.update(
+            self._update_params(
+                partial,
+                script,
+                upsert,
+                retry_on_conflict,
+                detect_noop,
+                if_seq_no,
+                if_primary_term,
+            )
+        )
+
+        ret_data = self._write(
+            "update", self.write_connection.update, index=self.index, id=doc_id, **kwargs
+        )
+
+        self.invalidate_cache()
+
+        return ret_data
+
+    @staticmethod
+    def _update_params(
+        partial: Optional[dict],
+        script: Union[str, dict, None],
+        upsert: Optional[dict],
+        retry_on_conflict: Optional[int],
+        detect_noop: Optional[bool],
+        if_seq_no: Optional[int],
+        if_primary_term: Optional[int],
+    ) -> dict:
+        """
+        Validate the arguments of an update and return them as api kwargs
+        """
+        if (partial is None) == (script is None):
+            raise ValueError("give either a partial document or a script")
+
+        if retry_on_conflict is not None and (
+            if_seq_no is not None or if_primary_term is not None
+        ):
+            raise ValueError(
+                "retry_on_conflict cannot be combined with if_seq_no/if_primary_term"
+            )
+
+        if (if_seq_no is None) != (if_primary_term is None):
+            raise ValueError("give both if_seq_no and if_primary_term")
+
+        params = {
+            "doc": partial,
+            "script": None if script is None else EsHandler._script(script),
+            "upsert": upsert,
+            "retry_on_conflict": retry_on_conflict,
+            "detect_noop": detect_noop,
+            "if_seq_no": if_seq_no,
+            "if_primary_term": if_primary_term,
+        }
+
+        return {k: v for k, v in params.items() if v is not None}
+
+    def bulk_update(
+        self,
+        updates: Iterable[dict],
+        retry_on_conflict: Optional[int] = None,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        **kwargs,
+    ) -> dict:
+        """
+        Apply many partial or scripted updates through the _bulk api; updates can be any iterable (e.g. a
+        generator) and is sent in chunks as for bulk_upsert. Every update is a dict with an '_id' and a 'doc'
+        (partial document) or a 'script', and optionally 'upsert', 'doc_as_upsert', 'scripted_upsert',
+        'detect_noop' and the meta fields '_retry_on_conflict', '_if_seq_no', '_if_primary_term' and '_routing':
+
+            handler.bulk_update(
+                {"_id": x, "script": {"source": "ctx._source.views += params.n", "params": {"n": n}}}
+                for x, n in view_counts.items()
+            )
+
+        retry_on_conflict is the default for updates without a '_retry_on_conflict' or '_if_seq_no'. Updates of the
+        same _id are applied in order, except through a write controller with a max_concurrency above 1.
+
+        Returns a summary dict with the amount of successful and failed items and the failed items themselves.
+        """
+        writer = BulkWriter(
+            self.write_connection,
+            self.index,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            op_type="update",
+            metrics=self.metrics,
+        )
+        updates = self.__update_actions(updates, retry_on_conflict)
+
+        try:
+            if self.write_controller is not None:
+                return self.write_controller.write(writer, updates, **kwargs)
+
+            return writer.write(updates, **kwargs)
+        finally:
+            self.invalidate_cache()
+
+    @staticmethod
+    def __update_actions(
+        updates: Iterable[dict], retry_on_conflict: Optional[int]
+    ) -> Iterator[dict]:
+        for update in updates:
+            if "_id" not in update:
+                raise ValueError(f"update without an '_id': {update}")
+
+            if ("doc" in update) == ("script" in update):
+                raise ValueError(
+                    f"update {update['_id']} needs either a 'doc' or a 'script'"
+                )
+
+            if (
+                retry_on_conflict is not None
+                and "_retry_on_conflict" not in update
+                and "_if_seq_no" not in update
+            ):
+                update = dict(update, _retry_on_conflict=retry_on_conflict)
+
+            yield update
+
+    def bulk_upsert(
+        self,
+        documents: Iterable[dict],
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        **kwargs,
+    ) -> dict:
+        """
+        Index the documents through the _bulk api; documents can be any iterable (e.g. a generator) and are sent in
+        chunks capped by both chunk_size and max_chunk_bytes. A document id can be given with the '_id' key.
+
+        With a write controller set, the chunk size adapts to the cluster (chunk_size is ignored) and items rejected
+        with 429 are retried with backoff. Chunks are sent one at a time and applied in order, unless the
+        controller has a max_concurrency above 1; then a repeated _id can be applied out of order.
+
+        Returns a summary dict with the amount of successful and failed items and the failed items themselves.
+        """
+        writer = BulkWriter(
+            self.write_connection,
+            self.index,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            metrics=self.metrics,
+        )
+
+        try:
+            if self.write_controller is not None:
+                return self.write_controller.write(writer, documents, **kwargs)
+
+            return writer.write(documents, **kwargs)
+        finally:
+            self.invalidate_cache()
+
+    def streaming_bulk_upsert(
+        self,
+        documents: Iterable[dict],
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        **kwargs,
+    ) -> Iterator[Tuple[bool, dict]]:
+        """
+        Same as bulk_upsert, but yields a (success, item) tuple per document in input order
+        """
+        writer = BulkWriter(
+            self.write_connection,
+            self.index,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            metrics=self.metrics,
+        )
+
+        try:
+            if self.write_controller is not None:
+                yield from self.write_controller.stream(writer, documents, **kwargs)
+            else:
+                yield from writer.stream(documents, **kwargs)
+        finally:
+            self.invalidate_cache()
+
     def delete(self, doc_id: str, **kwargs):
-        return self.es_connection.delete(index=self.index, id=doc_id, **kwargs)
+        ret_data = self._write(
+            "delete", self.write_connection.delete, index=self.index, id=doc_id, **kwargs
+        )
+
+        self.invalidate_cache()
+
+        return ret_data
+
+    def delete_by_query(
+        self,
+        filter_data: Union[dict, EsQuery],
+        slices: Union[int, str, None] = None,
+        wait_for_completion: bool = True,
+        requests_per_second: Optional[float] = None,
+        **kwargs,
+    ) -> Union[dict, EsTask]:
+        """
+        Delete the documents matching filter_data; a request body ({'query': ...}) or an EsCursor, whose query is
+        used. slices ('auto' or a number) splits the work over parallel slices, requests_per_second throttles
+        it. With wait_for_completion=False the call returns right away with an EsTask to follow, throttle or
+        cancel the deletion; otherwise the response of the finished request is returned.
+        """
+        return self.__by_query(
+            "delete_by_query",
+            self._by_query_body(filter_data),
+            slices,
+            wait_for_completion,
+            requests_per_second,
+            kwargs,
+        )
+
+    def update_by_query(
+        self,
+        filter_data: Union[dict, EsQuery, None] = None,
+        script: Union[str, dict, None] = None,
+        slices: Union[int, str, None] = None,
+        wait_for_completion: bool = True,
+        requests_per_second: Optional[float] = None,
+        **kwargs,
+    ) -> Union[dict, EsTask]:
+        """
+        Update the documents matching filter_data (all documents if None) with script; a painless source string or
+        a script dict ({'source': ..., 'params': {...}}). Without a script the documents are reindexed in place,
+        e.g. to pick up a mapping change. The other arguments are as for delete_by_query.
+        """
+        return self.__by_query(
+            "update_by_query",
+            self._by_query_body(filter_data, script),
+            slices,
+            wait_for_completion,
+            requests_per_second,
+            kwargs,
+        )
+
+    @staticmethod
+    def _by_query_body(
+        filter_data: Union[dict, EsQuery, None], script: Union[str, dict, None] = None
+    ) -> dict:
+        """
+        Build the body of a delete/update by query request from filter_data (all documents if None) and the
+        script of an update
+        """
+        if filter_data is None:
+            body = {}
+        elif isinstance(filter_data, EsQuery):
+            body = filter_data._by_query_body()
+        else:
+            body = dict(filter_data)
+
+        if script is not None:
+            body["script"] = EsHandler._script(script)
+
+        return body
+
+    @staticmethod
+    def _script(script: Union[str, dict]) -> dict:
+        """
+        Return the script dict of a painless source string or a script dict
+        """
+        return {"source": script, "lang": "painless"} if isinstance(script, str) else script
+
+    @staticmethod
+    def _by_query_params(
+        slices: Union[int, str, None],
+        wait_for_completion: bool,
+        requests_per_second: Optional[float],
+        kwargs: dict,
+    ) -> None:
+        """
+        Add the api kwargs of a delete/update by query request to the given kwargs
+        """
+        if slices is not None:
+            kwargs["slices"] = slices
+
+        if requests_per_second is not None:
+            kwargs["requests_per_second"] = requests_per_second
+
+        if not wait_for_completion:
+            kwargs["wait_for_completion"] = False
+
+    def __by_query(
+        self,
+        action: str,
+        body: dict,
+        slices: Union[int, str, None],
+        wait_for_completion: bool,
+        requests_per_second: Optional[float],
+        kwargs: dict,
+    ) -> Union[dict, EsTask]:
+        self._by_query_params(slices, wait_for_completion, requests_per_second, kwargs)
+
+        ret_data = self._perform(
+            action,
+            getattr(self.es_connection, action),
+            index=self.index,
+            body=body,
+            **kwargs,
+        )
+
+        self.invalidate_cache()
+
+        if not wait_for_completion:
+            return EsTask(self, ret_data["task"], action)
+
+        return ret_data
+
+    def export(
+        self,
+        cursor: "EsCursor" = None,
+        slices: int = 4,
+        workers: int = None,
+        page_size: int = 1000,
+        keep_alive: str = "5m",
+        callback: Callable[[dict], None] = None,
+        queue_size: int = None,
+    ) -> Union[Iterator[dict], int]:
+        """
+        Export all documents matching the query of the cursor (the whole index if no cursor is given). A point in
+        time is split into slices which are read concurrently by a thread pool of workers (defaults to one per
+        slice); pick slices as a multiple of the shard count. The pages of all slices are merged, in no
+        particular order, into a single generator. If a callback is given it is called with every document
+        instead and the number of exported documents is returned.
+
+        At most queue_size pages (defaults to two per worker) are buffered between the workers and the consumer.
+        """
+        if not isinstance(slices, int) or slices < 1:
+            raise ValueError("slices must be a positive integer")
+
+        if workers is None:
+            workers = slices
+
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+
+        documents = self.__sliced_export(
+            self.search() if cursor is None else cursor,
+            slices,
+            workers,
+            page_size,
+            keep_alive,
+            queue_size or workers * 2,
+        )
 
-    def delete_by_query(self, filter_data: dict, **kwargs):
-        return self.es_connection.delete_by_query(
-            index=self.index, body=filter_data, **kwargs
+        if callback is None:
+            return documents
+
+        count = 0
+        for document in documents:
+            callback(document)
+            count += 1
+
+        return count
+
+    def __sliced_export(
+        self,
+        cursor: "EsCursor",
+        slices: int,
+        workers: int,
+        page_size: int,
+        keep_alive: str,
+        queue_size: int,
+    ) -> Iterator[dict]:
+        pages = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+
+        pit_id = cursor._open_point_in_time(keep_alive)
+        executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"eswrap-export-{self.index}"
         )
 
+        try:
+            for slice_id in range(slices):
+                executor.submit(
+                    self.__read_slice,
+                    cursor,
+                    pages,
+                    stop,
+                    pit_id,
+                    keep_alive,
+                    page_size,
+                    slice_id,
+                    slices,
+                )
+
+            running = slices
+            while running:
+                page = pages.get()
+
+                if page is None:
+                    running -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield from page
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            cursor._close_point_in_time(pit_id)
+
+    def __read_slice(
+        self,
+        cursor: "EsCursor",
+        pages: queue.Queue,
+        stop: threading.Event,
+        pit_id: str,
+        keep_alive: str,
+        page_size: int,
+        slice_id: int,
+        max_slices: int,
+    ) -> None:
+        try:
+            for _, hits in cursor._pit_pages(
+                pit_id, keep_alive, page_size, slice_id, max_slices
+            ):
+                if not self.__put_page(pages, stop, cursor._parse_hits(hits)):
+                    return
+        except Exception as err:
+            self.__put_page(pages, stop, err)
+        finally:
+            # end of slice marker
+            self.__put_page(pages, stop, None)
+
+    @staticmethod
+    def __put_page(pages: queue.Queue, stop: threading.Event, page) -> bool:
+        # wait for room in the queue, unless the consumer has gone away
+        while not stop.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
     def __repr__(self):
         """return a string representation of the obj EsHandler"""
         return "<< EsHandler: {} >>".format(self.index)
 
 
-"""
-intervals query
-    A full text query that allows fine-grained control of the ordering and proximity of matching terms.
-match query
-    The standard query for performing full text queries, including fuzzy matching and phrase or
-    proximity queries.
-match_bool_prefix query
-    Creates a bool query that matches each term as a term query, except for the last term, which is
-    matched as a prefix query
-match_phrase query
-    Like the match query but used for matching exact phrases or word proximity matches.
-match_phrase_prefix query
-    Like the match_phrase query, but does a wildcard search on the final word.
-multi_match query
-    The multi-field version of the match query.
-combined_fields query
-    Matches over multiple fields as if they had been indexed into one combined field.
-query_string query
-    Supports the compact Lucene query string syntax, allowing you to specify AND|OR|NOT conditions and
-    multi-field search within a single query string. For expert users only.
-simple_query_string query
-    A simpler, more robust version of the query_string syntax suitable for exposing directly to users.
-
-exists query
-    Returns documents that contain any indexed value for a field.
-fuzzy query
-    Returns documents that contain terms similar to the search term. Elasticsearch measures similarity,
-    or fuzziness, using a Levenshtein edit distance.
-ids query
-    Returns documents based on their document IDs.
-prefix query
-    Returns documents that contain a specific prefix in a provided field.
-range query
-    Returns documents that contain terms within a provided range.
-regexp query
-    Returns documents that contain terms matching a regular expression.
-term query
-    Returns documents that contain an exact term in a provided field.
-terms query
-    Returns documents that contain one or more exact terms in a provided field.
-terms_set query
-    Returns documents that contain a minimum number of exact terms in a provided field. You can define
-    the minimum number of matching terms using a field or script.
-wildcard query
-    Returns documents that contain terms matching a wildcard pattern.
-"""
-
-
-class EsCursor(object):
+class EsCursor(EsQuery):
     """
     The EsCursor
     """
@@ -137,54 +758,11 @@ class EsCursor(object):
         :type es_handler: EsHandler
         """
 
-        self.__es_handler = es_handler
+        self.logger = logging.getLogger(__name__)
 
-        self.__filter_data = collections.defaultdict(
-            lambda: collections.defaultdict(lambda: collections.defaultdict(dict))
-        )
+        self.__es_handler = es_handler
 
-        self.tier1_query = False
-        self.tierx_query = False
-
-        self.supported_bool_filter_types = [
-            "match",
-            "match_phrase",
-            "match_phrase_prefix",
-            "exists",
-            "fuzzy",
-            "prefix",
-            "term",
-            "terms",
-            "range",
-            "regexp",
-            "wildcard",
-        ]
-
-        self.supported_bool_query_types = [
-            "match",
-            "match_phrase",
-            "match_phrase_prefix",
-            "exists",
-            "fuzzy",
-            "ids",
-            "prefix",
-            "term",
-            "terms",
-            "range",
-            "regexp",
-            "wildcard",
-        ]
-
-        self.supported_bool_exclude_types = self.supported_bool_query_types
-
-        for k, v in kwargs.items():
-            setattr(self, k, v)
-
-        self.__empty = False
-
-        self.__limit = limit
-        self.__skip = skip
-        self.__sort = sort
+        super().__init__(limit=limit, skip=skip, sort=sort, **kwargs)
 
         self.data_queue = None
 
@@ -192,252 +770,292 @@ class EsCursor(object):
     def es_handler(self) -> EsHandler:
         return self.__es_handler
 
-    @property
-    def filter_data(self) -> dict:
-        return self.__filter_data
-
-    @property
-    def empty(self) -> bool:
-        return self.__empty
-
-    @property
-    def q_limit(self) -> int:
-        return self.__limit
-
-    @q_limit.setter
-    def q_limit(self, limit: int) -> None:
-        self.__limit = limit
-
-    @property
-    def q_skip(self) -> int:
-        return self.__skip
-
-    @q_skip.setter
-    def q_skip(self, skip: int) -> None:
-        self.__skip = skip
+    def clone(self, es_handler: Optional[EsHandler] = None):
+        """
+        Return a copy of this cursor, bound to es_handler (i.e. searching another index) if given
+        """
+        clone = super().clone()
+        clone.data_queue = None
 
-    @property
-    def q_sort(self) -> list:
-        return self.__sort
+        if es_handler is not None:
+            clone.__es_handler = es_handler
 
-    @q_sort.setter
-    def q_sort(self, sort: list) -> None:
-        self.__sort = sort
+        return clone
 
     def __repr__(self):
         """return a string representation of the obj GenericApi"""
         return "<<EsCursor: {}>>".format(self.es_handler.index)
 
-    def __fetch_results(self):
-        return self.es_handler.es_connection.search(
-            index=self.es_handler.index, body=self.filter_data
+    def __fetch_results(self, body: dict, filter_path: tuple):
+        return self.es_handler._perform(
+            "search",
+            self.es_handler.es_connection.search,
+            index=self.es_handler.index,
+            body=body,
+            filter_path=self._filter_path(filter_path),
         )
 
-    def __set_query_tier_level(self):
-        if not self.tier1_query:
-            self.tier1_query = True
-            return False
+    def _filter_path(self, paths: tuple) -> Optional[list]:
+        filter_path = super()._filter_path(paths)
 
-        if not self.tierx_query:
-            self.tierx_query = True
+        # keep the fields the metrics hook reads
+        if filter_path is not None and self.es_handler.metrics is not None:
+            filter_path.extend(METRICS_FILTER_PATH)
 
-        return True
+        return filter_path
 
-    def filter(self, query_type: str = None, **kwargs):
-        """
-        In a filter context, a query clause answers the question “Does this document match this query clause?” The
-        answer is a simple Yes or No, no scores are calculated. Filter context is mostly used for filtering
-        structured data, e.g.
+    def _open_point_in_time(self, keep_alive: str) -> str:
+        return self.es_handler._perform(
+            "open_point_in_time",
+            self.es_handler.es_connection.open_point_in_time,
+            index=self.es_handler.index,
+            keep_alive=keep_alive,
+        )["id"]
 
-            Does this timestamp fall into the range 2015 to 2016?
-            Is the status field set to "published"?
+    def _close_point_in_time(self, pit_id: str) -> None:
+        try:
+            self.es_handler._perform(
+                "close_point_in_time",
+                self.es_handler.es_connection.close_point_in_time,
+                id=pit_id,
+            )
+        except Exception as err:
+            # the pit will expire on its own after keep_alive
+            self.logger.warning(
+                f"Could not close point in time for {self.es_handler.index}: {err}"
+            )
 
-        Frequently used filters will be cached automatically by Elasticsearch, to speed up performance.
+    def search(self):
 
-        Filter context is in effect whenever a query clause is passed to a filter parameter, such as the filter or
-        must_not parameters in the bool query, the filter parameter in the constant_score query, or the filter
-        aggregation.
-        """
-        if query_type not in self.supported_bool_filter_types:
-            raise QueryTypeNotSupportedError
+        body = self._search_body()
 
-        query_list = []
+        cache = self.es_handler.cache
 
-        query_operand = "filter"
+        if cache is not None:
+            cache_key = self.body_key
+            hit, ret_dict = cache.get(cache_key)
+            if hit:
+                return dict(ret_dict)
+            generation = cache.generation
 
-        for k, v in kwargs.items():
-            query_data = collections.defaultdict(dict)
-            if not isinstance(v, list):
-                query_data[k] = v
-                query_list.append({query_type: dict(query_data)})
-            else:
-                for each in v:
-                    query_data[k] = each
-                    query_list.append({query_type: dict(query_data)})
+        results = self.__fetch_results(body, self.SEARCH_FILTER_PATH)
 
-        self.filter_data["query"]["bool"][query_operand] = query_list
+        ret_dict = self._parse_search_results(results)
 
-        return self
+        if cache is not None:
+            cache.set(cache_key, ret_dict, generation)
+            return dict(ret_dict)
 
-    def query(self, query_type: str = None, **kwargs):
-        """
-        In the query context, a query clause answers the question “How well does this document match this query clause?”
-        Besides deciding whether or not the document matches, the query clause also calculates a relevance score in
-        the _score metadata field.
+        return ret_dict
 
-        Query context is in effect whenever a query clause is passed to a query parameter, such as the query parameter
-        in the search API.
+    def count(self, **kwargs) -> int:
         """
-
-        if query_type not in self.supported_bool_query_types:
-            raise QueryTypeNotSupportedError
-
-        query_list = []
-
-        query_operand = "must"
-
-        for k, v in kwargs.items():
-            query_data = collections.defaultdict(dict)
-            if not isinstance(v, list):
-                query_data[k] = v
-                query_list.append({query_type: dict(query_data)})
-            else:
-                query_operand = "should"
-                for each in v:
-                    query_data[k] = each
-                    query_list.append({query_type: dict(query_data)})
-
-        self.filter_data["query"]["bool"][query_operand] = query_list
-
-        return self
-
-    def exclude(self, query_type: str = None, **kwargs):
+        Return the exact number of documents matching the query of this cursor; limit, skip and sort are ignored
         """
-        In the query context, a query clause answers the question “How well does this document match this query clause?”
-        Besides deciding whether or not the document matches, the query clause also calculates a relevance score in
-        the _score metadata field.
-
-        Query context is in effect whenever a query clause is passed to a query parameter, such as the query parameter
-        in the search API.
+        return self.es_handler._perform(
+            "count",
+            self.es_handler.es_connection.count,
+            index=self.es_handler.index,
+            body=self._count_body(),
+            **kwargs,
+        )["count"]
+
+    def profile(self, **kwargs) -> dict:
         """
+        Run the search of this cursor with profiling enabled and return a summary of where the time went:
+
+            {
+                'took': 12,
+                'shards': [{'node', 'index', 'shard', 'query_ms', 'rewrite_ms', 'collector_ms', 'queries'}, ...],
+                'clauses': [{'type', 'description', 'time_ms', 'shards'}, ...],
+            }
+
+        queries is the timing tree of the query per shard; every node has a type (e.g. 'BooleanQuery',
+        'RegexpQuery'), the lucene description of the clause, its time_ms, its percent of the shard query time
+        and its children. clauses lists every clause with its time summed over the shards, slowest first.
+        Profiling adds overhead of its own; compare times relative to each other rather than to normal searches.
+        """
+        results = self.es_handler._perform(
+            "search",
+            self.es_handler.es_connection.search,
+            index=self.es_handler.index,
+            body=self._profile_body(),
+            filter_path=self._filter_path(("took", "profile")),
+            **kwargs,
+        )
 
-        if query_type not in self.supported_bool_exclude_types:
-            raise QueryTypeNotSupportedError
-
-        query_list = []
-
-        query_operand = "must_not"
-
-        for k, v in kwargs.items():
-            query_data = collections.defaultdict(dict)
-            if not isinstance(v, list):
-                query_data[k] = v
-                query_list.append({query_type: dict(query_data)})
-            else:
-                for each in v:
-                    query_data[k] = each
-                    query_list.append({query_type: dict(query_data)})
-
-        self.filter_data["query"]["bool"][query_operand] = query_list
-
-        return self
-
-    def match_all(self):
-        self.filter_data["query"]["bool"] = {"must": {"match_all": {}}}
-
-        return self
+        return self._parse_profile(results)
 
-    def search(self):
+    def aggregate(self, **kwargs) -> dict:
+        """
+        Run the added aggregations (agg_terms(), agg_stats(), ...) on the documents matching the query, without
+        fetching any hits, and return the aggregation results by name
+        """
+        results = self.es_handler._perform(
+            "search",
+            self.es_handler.es_connection.search,
+            index=self.es_handler.index,
+            body=self._aggregation_body(),
+            filter_path=self._filter_path(("aggregations",)),
+            **kwargs,
+        )
 
-        ret_dict = {"skip": self.q_skip, "limit": self.q_limit}
+        return results.get("aggregations", {})
 
-        self.filter_data["size"] = self.q_limit
-        self.filter_data["from"] = self.q_skip
+    def composite(self, sources, size: int = 1000, name: str = "composite", **kwargs):
+        """
+        Generator yielding every bucket of a composite aggregation over the documents matching the query, paging
+        with after_key so only size buckets are held in memory at a time. sources is a list of composite sources
+        (terms, histogram, date_histogram) or a {name: field} dict of terms sources, e.g.
 
-        results = self.__fetch_results()
+            cursor.composite({"country": "country.keyword", "city": "city.keyword"})
 
-        if isinstance(results, str):
-            ret_dict["data"] = []
-            ret_dict["total"] = 0
-            return ret_dict
+        Each bucket is a dict with a 'key' ({source name: value}) and a 'doc_count'.
+        """
+        after = None
+
+        while True:
+            results = self.es_handler._perform(
+                "search",
+                self.es_handler.es_connection.search,
+                index=self.es_handler.index,
+                body=self._aggregation_body(
+                    {name: self._composite_aggregation(sources, size, after)}
+                ),
+                filter_path=self._filter_path(
+                    (f"aggregations.{name}.buckets", f"aggregations.{name}.after_key")
+                ),
+                **kwargs,
+            )
 
-        try:
-            if len(results["hits"]["hits"]) > 0:
-                count = results["hits"]["total"]["value"]
-                results = [x["_source"] for x in results["hits"]["hits"]]
-            else:
-                count = 0
-                results = []
+            aggregation = results.get("aggregations", {}).get(name, {})
+            buckets = aggregation.get("buckets", [])
 
-            ret_dict["data"] = results
-            ret_dict["total"] = count
+            yield from buckets
 
-        except Exception:
-            ret_dict["data"] = results
-            ret_dict["total"] = len(results)
+            after = aggregation.get("after_key")
 
-        return ret_dict
+            if not buckets or after is None:
+                break
 
     def execute(self):
         """
         Fetch results from Elasticsearch
         """
 
-        results = self.__fetch_results()
+        results = self.__fetch_results(self._search_body(), self.HITS_FILTER_PATH)
 
         if isinstance(results, str):
             self.data_queue = None
             return
 
         try:
-            if len(results["hits"]["hits"]) > 0:
-                ret_list = []
-                for x in results["hits"]["hits"]:
-                    val_dict = x["_source"]
-                    val_dict.update({"_id": x["_id"]})
-                    ret_list.append(val_dict)
-
-                self.data_queue = ret_list
+            if len(results["hits"].get("hits", [])) > 0:
+                self.data_queue = self._parse_hits(results["hits"]["hits"])
         except Exception:
             self.data_queue = results
 
-    def set_limit(self, value: int):
+    def iter_hits(self) -> Iterator[Hit]:
         """
-        Method to limit the amount of returned data; default is set to 10
+        Fetch a single page of results (limit and skip applied) and yield them in order as Hit views, exposing the
+        _id, score, _source and doc value fields of each hit without copying or modifying the decoded response
         """
+        for hit in self._hits_page().get("hits", {}).get("hits", []):
+            yield Hit(hit)
 
-        if not isinstance(value, int):
-            raise TypeError("limit must be an integer")
+    def _hits_page(self) -> dict:
+        """
+        Fetch a single page of results with the fields of the Hit views (and the total)
+        """
+        return self.__fetch_results(self._search_body(), self.HIT_VIEW_FILTER_PATH)
 
-        self.q_limit = value
+    def stream_hits(self, page_size: int = 1000, keep_alive: str = "1m") -> Iterator[Hit]:
+        """
+        Same as stream(), but yields Hit views instead of documents
+        """
 
-        self.filter_data["size"] = self.q_limit
+        pit_id = self._open_point_in_time(keep_alive)
 
-        return self
+        try:
+            for pit_id, hits in self._pit_pages(pit_id, keep_alive, page_size):
+                for hit in hits:
+                    yield Hit(hit)
+        finally:
+            self._close_point_in_time(pit_id)
 
-    def set_skip(self, value: int):
+    def stream(self, page_size: int = 1000, keep_alive: str = "1m"):
         """
-        Method to skip the given amount of records before returning the data
+        Generator walking the complete result set of the query, ignoring the limit and skip values. A point in time
+        is opened on the index and the results are fetched in pages of page_size with search_after, so only a
+        single page is held in memory at a time. Results are yielded in sort order (the index order if no sort is
+        set); the point in time is closed on exhaustion or when the generator is closed or garbage collected.
         """
 
-        if not isinstance(value, int):
-            raise TypeError("skip must be an integer")
+        pit_id = self._open_point_in_time(keep_alive)
 
-        self.q_skip = value
+        try:
+            for pit_id, hits in self._pit_pages(pit_id, keep_alive, page_size):
+                yield from self._parse_hits(hits)
+        finally:
+            self._close_point_in_time(pit_id)
 
-        self.filter_data["from"] = self.q_skip
+    def export(
+        self,
+        path_or_fileobj: Union[str, os.PathLike, object],
+        format: str = "ndjson",
+        compress: bool = False,
+        fields: Optional[List[str]] = None,
+        page_size: int = 1000,
+        keep_alive: str = "1m",
+    ) -> dict:
+        """
+        Write the complete result set of the query to a file as 'ndjson' or 'csv', optionally gzip compressed.
+        Results are read with stream() and written one page at a time, so memory use does not depend on the size
+        of the result set. For csv, the columns default to the fields of the first document.
 
-        return self
+        Returns the number of documents, the (uncompressed) bytes written, the elapsed time and documents/sec.
+        """
+        return FileExporter(
+            format=format, compress=compress, fields=fields, batch_size=page_size
+        ).write(self.stream(page_size=page_size, keep_alive=keep_alive), path_or_fileobj)
 
-    def set_sort(self, values: list):
+    def _pit_pages(
+        self,
+        pit_id: str,
+        keep_alive: str,
+        page_size: int,
+        slice_id: int = None,
+        max_slices: int = None,
+    ) -> Iterator[Tuple[str, list]]:
         """
-        A comma-separated list of <field>:<direction> pairs
+        Generator yielding a (pit_id, hits) tuple per page of a point in time search, optionally restricted to a
+        single slice; the caller owns (and closes) the point in time
         """
-        self.q_sort = values
 
-        self.filter_data["sort"] = values
+        body = self._stream_body(page_size)
 
-        return self
+        if max_slices is not None and max_slices > 1:
+            body["slice"] = {"id": slice_id, "max": max_slices}
+
+        while True:
+            body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+
+            results = self.es_handler._perform(
+                "search",
+                self.es_handler.es_connection.search,
+                body=body,
+                filter_path=self._filter_path(self.STREAM_FILTER_PATH),
+            )
+
+            pit_id = results.get("pit_id", pit_id)
+            hits = results.get("hits", {}).get("hits", [])
+
+            yield pit_id, hits
+
+            if len(hits) < page_size:
+                break
+
+            body["search_after"] = hits[-1]["sort"]
 
     def __iter__(self):
         """Make this class an iterator"""
@@ -446,7 +1064,7 @@ class EsCursor(object):
 
     def next(self):
         """Iterate to the results and return database objects"""
-        if self.__empty:
+        if self.empty:
             raise StopIteration
         if self.data_queue is None:
             raise StopIteration
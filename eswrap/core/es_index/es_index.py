@@ -1,12 +1,27 @@
+from typing import Optional
+
 from elasticsearch import Elasticsearch
 
 from eswrap.core.es_handler.es_handler import EsHandler
+from eswrap.core.metrics.metrics import MetricsHook
+from eswrap.core.write_controller.write_controller import WriteController
 
 
 class EsIndex(object):
-    def __init__(self, name: str, es_client: Elasticsearch):
+    def __init__(
+        self,
+        name: str,
+        es_client: Elasticsearch,
+        metrics: Optional[MetricsHook] = None,
+        write_controller: Optional[WriteController] = None,
+    ):
         self.name = name
-        self.handler = EsHandler(es_connection=es_client, index=name)
+        self.handler = EsHandler(
+            es_connection=es_client,
+            index=name,
+            metrics=metrics,
+            write_controller=write_controller,
+        )
 
     def __call__(self, *args, **kwargs):
         return self.handler
@@ -0,0 +1,885 @@
+from typing import Optional, Tuple
+
+from eswrap.core.query_cache.query_cache import QueryCache
+from eswrap.errors.queries import QueryTypeNotSupportedError
+
+"""
+intervals query
+    A full text query that allows fine-grained control of the ordering and proximity of matching terms.
+match query
+    The standard query for performing full text queries, including fuzzy matching and phrase or
+    proximity queries.
+match_bool_prefix query
+    Creates a bool query that matches each term as a term query, except for the last term, which is
+    matched as a prefix query
+match_phrase query
+    Like the match query but used for matching exact phrases or word proximity matches.
+match_phrase_prefix query
+    Like the match_phrase query, but does a wildcard search on the final word.
+multi_match query
+    The multi-field version of the match query.
+combined_fields query
+    Matches over multiple fields as if they had been indexed into one combined field.
+query_string query
+    Supports the compact Lucene query string syntax, allowing you to specify AND|OR|NOT conditions and
+    multi-field search within a single query string. For expert users only.
+simple_query_string query
+    A simpler, more robust version of the query_string syntax suitable for exposing directly to users.
+
+exists query
+    Returns documents that contain any indexed value for a field.
+fuzzy query
+    Returns documents that contain terms similar to the search term. Elasticsearch measures similarity,
+    or fuzziness, using a Levenshtein edit distance.
+ids query
+    Returns documents based on their document IDs.
+prefix query
+    Returns documents that contain a specific prefix in a provided field.
+range query
+    Returns documents that contain terms within a provided range.
+regexp query
+    Returns documents that contain terms matching a regular expression.
+term query
+    Returns documents that contain an exact term in a provided field.
+terms query
+    Returns documents that contain one or more exact terms in a provided field.
+terms_set query
+    Returns documents that contain a minimum number of exact terms in a provided field. You can define
+    the minimum number of matching terms using a field or script.
+wildcard query
+    Returns documents that contain terms matching a wildcard pattern.
+"""
+
+
+SUPPORTED_BOOL_FILTER_TYPES = frozenset(
+    (
+        "match",
+        "match_phrase",
+        "match_phrase_prefix",
+        "exists",
+        "fuzzy",
+        "prefix",
+        "term",
+        "terms",
+        "range",
+        "regexp",
+        "wildcard",
+    )
+)
+
+SUPPORTED_BOOL_QUERY_TYPES = frozenset(
+    (
+        "match",
+        "match_phrase",
+        "match_phrase_prefix",
+        "exists",
+        "fuzzy",
+        "ids",
+        "prefix",
+        "term",
+        "terms",
+        "range",
+        "regexp",
+        "wildcard",
+    )
+)
+
+SUPPORTED_BOOL_EXCLUDE_TYPES = SUPPORTED_BOOL_QUERY_TYPES
+
+BOOL_OPERANDS = ("filter", "must", "should", "must_not")
+
+
+class Clause(tuple):
+    """
+    A single leaf clause of a bool query, e.g. ('term', 'status', 'published'); immutable
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, query_type: str, field: Optional[str] = None, value=None):
+        return tuple.__new__(cls, (query_type, field, value))
+
+    @property
+    def query_type(self) -> str:
+        return self[0]
+
+    @property
+    def field(self) -> Optional[str]:
+        return self[1]
+
+    @property
+    def value(self):
+        return self[2]
+
+    def to_dict(self) -> dict:
+        if self[1] is None:
+            return {self[0]: {}}
+
+        return {self[0]: {self[1]: self[2]}}
+
+    def __repr__(self):
+        """return a string representation of the obj Clause"""
+        return "<Clause: {}>".format(self.to_dict())
+
+
+class BoolQuery(tuple):
+    """
+    A node of the clause tree of a bool query: the clauses added to one operand on top of a parent node.
+    Immutable; add() returns a new node pointing at the existing tree, so cloning a base query and deriving from
+    it never copies clauses.
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        parent: Optional["BoolQuery"] = None,
+        operand: Optional[str] = None,
+        clauses: Tuple[Clause, ...] = (),
+    ):
+        return tuple.__new__(cls, (parent, operand, clauses))
+
+    @property
+    def parent(self) -> Optional["BoolQuery"]:
+        return self[0]
+
+    @property
+    def operand(self) -> Optional[str]:
+        return self[1]
+
+    @property
+    def clauses(self) -> Tuple[Clause, ...]:
+        return self[2]
+
+    def add(self, operand: str, clauses: Tuple[Clause, ...]) -> "BoolQuery":
+        """
+        Return a new tree with the clauses appended to the given operand
+        """
+        return tuple.__new__(BoolQuery, (self, operand, clauses))
+
+    def to_dict(self) -> dict:
+        """
+        Render the query part of the request body
+        """
+        nodes = []
+        node = self
+        while node is not None:
+            nodes.append(node)
+            node = node[0]
+
+        bool_query = {}
+        for _, operand, clauses in reversed(nodes):
+            if clauses:
+                query_list = bool_query.get(operand)
+                if query_list is None:
+                    query_list = bool_query[operand] = []
+                # same as Clause.to_dict(), inlined as this is the hot path of every request
+                for query_type, field, value in clauses:
+                    query_list.append(
+                        {query_type: {field: value}}
+                        if field is not None
+                        else {query_type: {}}
+                    )
+
+        return {"bool": bool_query}
+
+    def __bool__(self):
+        node = self
+        while node is not None:
+            if node[2]:
+                return True
+            node = node[0]
+
+        return False
+
+    def __repr__(self):
+        """return a string representation of the obj BoolQuery"""
+        return "<BoolQuery: {}>".format(self.to_dict())
+
+
+EMPTY_QUERY = BoolQuery()
+
+MATCH_ALL_QUERY = BoolQuery(None, "must", (Clause("match_all"),))
+
+
+class EsQuery(object):
+    """
+    The EsQuery; the query builder shared by the EsCursor and the AsyncEsCursor
+    """
+
+    # response fields needed per result shape; everything else is dropped by the cluster with filter_path
+    SEARCH_FILTER_PATH = ("hits.total", "hits.hits._source", "hits.hits.fields")
+    HITS_FILTER_PATH = (
+        "hits.total",
+        "hits.hits._id",
+        "hits.hits._source",
+        "hits.hits.fields",
+    )
+    HIT_VIEW_FILTER_PATH = HITS_FILTER_PATH + (
+        "hits.hits._index",
+        "hits.hits._score",
+        "hits.hits.sort",
+    )
+    STREAM_FILTER_PATH = (
+        "pit_id",
+        "hits.hits._id",
+        "hits.hits._source",
+        "hits.hits.fields",
+        "hits.hits.sort",
+    )
+
+    supported_bool_filter_types = SUPPORTED_BOOL_FILTER_TYPES
+    supported_bool_query_types = SUPPORTED_BOOL_QUERY_TYPES
+    supported_bool_exclude_types = SUPPORTED_BOOL_EXCLUDE_TYPES
+
+    def __init__(
+        self,
+        limit: int = 10,
+        skip: int = None,
+        sort: list = None,
+        **kwargs,
+    ):
+        """
+        Create a new EsQuery object.
+        """
+
+        self.__query = EMPTY_QUERY
+        # other top level request body parameters, e.g. _source
+        self.__params = {}
+        # memoised request body, search body and cache key; reset on every change
+        self.__body = None
+        self.__search_body = None
+        self.__body_key = None
+
+        self.tier1_query = False
+        self.tierx_query = False
+
+        # trim the response envelope to what the result shape needs
+        self.trim_response = True
+
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+
+        self.__empty = False
+
+        self.__limit = limit
+        self.__skip = skip
+        self.__sort = sort
+
+    @property
+    def filter_data(self) -> dict:
+        """
+        The request body of the query; rendered once per change and shared, so treat it as read only
+        """
+        if self.__body is None:
+            body = {}
+
+            if self.__query:
+                body["query"] = self.__query.to_dict()
+
+            body.update(self.__params)
+
+            if self.__limit is not None:
+                body["size"] = self.__limit
+
+            if self.__skip is not None:
+                body["from"] = self.__skip
+
+            if self.__sort:
+                body["sort"] = self.__sort
+
+            self.__body = body
+
+        return self.__body
+
+    @property
+    def body_key(self) -> str:
+        """
+        Canonical form of the request body, used as the key of the query cache
+        """
+        body = self.filter_data
+
+        # the key is tied to the rendered body it was made from
+        if self.__body_key is None or self.__body_key[0] is not body:
+            self.__body_key = (body, QueryCache.make_key(body))
+
+        return self.__body_key[1]
+
+    @property
+    def bool_query(self) -> BoolQuery:
+        return self.__query
+
+    @property
+    def empty(self) -> bool:
+        return self.__empty
+
+    @property
+    def q_limit(self) -> int:
+        return self.__limit
+
+    @q_limit.setter
+    def q_limit(self, limit: int) -> None:
+        self.__limit = limit
+        self.__body = None
+
+    @property
+    def q_skip(self) -> int:
+        return self.__skip
+
+    @q_skip.setter
+    def q_skip(self, skip: int) -> None:
+        self.__skip = skip
+        self.__body = None
+
+    @property
+    def q_sort(self) -> list:
+        return self.__sort
+
+    @q_sort.setter
+    def q_sort(self, sort: list) -> None:
+        self.__sort = sort
+        self.__body = None
+
+    def clone(self):
+        """
+        Return a copy of this query which can be refined without changing the original; the clause tree is
+        shared, so a common base query can be cloned cheaply for every derived query.
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.__params = dict(self.__params)
+
+        return clone
+
+    @property
+    def track_total_hits(self):
+        return self._get_param("track_total_hits")
+
+    def set_track_total_hits(self, value):
+        """
+        How exactly search() counts the matching documents: True counts all of them, an integer N counts up to N
+        (the cluster default is 10000) and False disables counting, which is the cheapest. The result of search()
+        holds the total and a 'total_relation' of 'eq' (exact), 'gte' (lower bound) or None (not counted).
+        """
+        if not isinstance(value, (bool, int)) or (
+            not isinstance(value, bool) and value < 0
+        ):
+            raise TypeError("track_total_hits must be a boolean or a non-negative integer")
+
+        self._set_param("track_total_hits", value)
+
+        return self
+
+    def _count_body(self) -> dict:
+        """
+        Return the request body for a count of the documents matching the query
+        """
+        body = self.filter_data
+
+        return {"query": body["query"]} if "query" in body else {}
+
+    def _get_param(self, key: str, default=None):
+        return self.__params.get(key, default)
+
+    def _set_param(self, key: str, value) -> None:
+        """
+        Set a top level request body parameter; None removes it
+        """
+        if value is None:
+            self.__params.pop(key, None)
+        else:
+            self.__params[key] = value
+
+        self.__body = None
+
+    def __set_query_tier_level(self):
+        if not self.tier1_query:
+            self.tier1_query = True
+            return False
+
+        if not self.tierx_query:
+            self.tierx_query = True
+
+        return True
+
+    @staticmethod
+    def __make_clauses(query_type: str, kwargs: dict) -> Tuple[Clause, ...]:
+        # tuple.__new__ skips the python level Clause.__new__; this runs for every clause of every cursor
+        new = tuple.__new__
+        query_list = []
+
+        for k, v in kwargs.items():
+            if not isinstance(v, list):
+                query_list.append(new(Clause, (query_type, k, v)))
+            else:
+                for each in v:
+                    query_list.append(new(Clause, (query_type, k, each)))
+
+        return tuple(query_list)
+
+    def __add_clauses(self, query_operand: str, clauses: Tuple[Clause, ...]):
+        self.__query = tuple.__new__(BoolQuery, (self.__query, query_operand, clauses))
+        self.__body = None
+
+        return self
+
+    def filter(self, query_type: str = None, **kwargs):
+        """
+        In a filter context, a query clause answers the question “Does this document match this query clause?” The
+        answer is a simple Yes or No, no scores are calculated. Filter context is mostly used for filtering
+        structured data, e.g.
+
+            Does this timestamp fall into the range 2015 to 2016?
+            Is the status field set to "published"?
+
+        Frequently used filters will be cached automatically by Elasticsearch, to speed up performance.
+
+        Filter context is in effect whenever a query clause is passed to a filter parameter, such as the filter or
+        must_not parameters in the bool query, the filter parameter in the constant_score query, or the filter
+        aggregation.
+        """
+        if query_type not in self.supported_bool_filter_types:
+            raise QueryTypeNotSupportedError
+
+        return self.__add_clauses("filter", self.__make_clauses(query_type, kwargs))
+
+    def query(self, query_type: str = None, **kwargs):
+        """
+        In the query context, a query clause answers the question “How well does this document match this query clause?”
+        Besides deciding whether or not the document matches, the query clause also calculates a relevance score in
+        the _score metadata field.
+
+        Query context is in effect whenever a query clause is passed to a query parameter, such as the query parameter
+        in the search API.
+        """
+
+        if query_type not in self.supported_bool_query_types:
+            raise QueryTypeNotSupportedError
+
+        query_operand = "must"
+
+        for v in kwargs.values():
+            if isinstance(v, list):
+                query_operand = "should"
+                break
+
+        return self.__add_clauses(
+            query_operand, self.__make_clauses(query_type, kwargs)
+        )
+
+    def exclude(self, query_type: str = None, **kwargs):
+        """
+        In the query context, a query clause answers the question “How well does this document match this query clause?”
+        Besides deciding whether or not the document matches, the query clause also calculates a relevance score in
+        the _score metadata field.
+
+        Query context is in effect whenever a query clause is passed to a query parameter, such as the query parameter
+        in the search API.
+        """
+
+        if query_type not in self.supported_bool_exclude_types:
+            raise QueryTypeNotSupportedError
+
+        return self.__add_clauses("must_not", self.__make_clauses(query_type, kwargs))
+
+    def match_all(self):
+        self.__query = MATCH_ALL_QUERY
+        self.__body = None
+
+        return self
+
+    def only(self, *fields: str):
+        """
+        Only return the given fields of the _source of each hit; wildcards are allowed
+        """
+        return self.__set_source_filter("includes", fields)
+
+    def without(self, *fields: str):
+        """
+        Leave the given fields out of the _source of each hit; wildcards are allowed
+        """
+        return self.__set_source_filter("excludes", fields)
+
+    def docvalue_fields(self, *fields):
+        """
+        Return the given fields from doc values (as lists, merged into the returned documents) instead of from
+        the _source; a field can be a name or a dict with a 'field' and 'format' key. Combine with only() or
+        without() to also skip the matching _source fields.
+        """
+        self._set_param(
+            "docvalue_fields", self._get_param("docvalue_fields", []) + list(fields)
+        )
+
+        return self
+
+    def __set_source_filter(self, key: str, fields: tuple):
+        source = self._get_param("_source")
+
+        source = dict(source) if isinstance(source, dict) else {}
+
+        source[key] = list(dict.fromkeys(source.get(key, []) + list(fields)))
+
+        self._set_param("_source", source)
+
+        return self
+
+    def agg_terms(self, name: str, field: str, size: int = 10, **kwargs):
+        """
+        Add a terms aggregation (the top size values of field with their document counts) named name
+        """
+        return self.__add_aggregation(
+            name, {"terms": {"field": field, "size": size, **kwargs}}
+        )
+
+    def agg_date_histogram(
+        self,
+        name: str,
+        field: str,
+        calendar_interval: str = None,
+        fixed_interval: str = None,
+        **kwargs,
+    ):
+        """
+        Add a date_histogram aggregation named name; give either a calendar_interval (e.g. 'day', '1M') or a
+        fixed_interval (e.g. '30m', '12h')
+        """
+        if (calendar_interval is None) == (fixed_interval is None):
+            raise ValueError("give either calendar_interval or fixed_interval")
+
+        interval = (
+            {"calendar_interval": calendar_interval}
+            if calendar_interval is not None
+            else {"fixed_interval": fixed_interval}
+        )
+
+        return self.__add_aggregation(
+            name, {"date_histogram": {"field": field, **interval, **kwargs}}
+        )
+
+    def agg_stats(self, name: str, field: str, **kwargs):
+        """
+        Add a stats aggregation (count, min, max, avg and sum of field) named name
+        """
+        return self.__add_aggregation(name, {"stats": {"field": field, **kwargs}})
+
+    def agg_cardinality(
+        self, name: str, field: str, precision_threshold: int = None, **kwargs
+    ):
+        """
+        Add a cardinality aggregation (approximate count of distinct values of field) named name
+        """
+        if precision_threshold is not None:
+            kwargs["precision_threshold"] = precision_threshold
+
+        return self.__add_aggregation(
+            name, {"cardinality": {"field": field, **kwargs}}
+        )
+
+    def __add_aggregation(self, name: str, aggregation: dict):
+        aggs = dict(self._get_param("aggs", {}))
+        aggs[name] = aggregation
+
+        self._set_param("aggs", aggs)
+
+        return self
+
+    def set_limit(self, value: int):
+        """
+        Method to limit the amount of returned data; default is set to 10
+        """
+
+        if not isinstance(value, int):
+            raise TypeError("limit must be an integer")
+
+        self.q_limit = value
+
+        return self
+
+    def set_skip(self, value: int):
+        """
+        Method to skip the given amount of records before returning the data
+        """
+
+        if not isinstance(value, int):
+            raise TypeError("skip must be an integer")
+
+        self.q_skip = value
+
+        return self
+
+    def set_sort(self, values: list):
+        """
+        A comma-separated list of <field>:<direction> pairs
+        """
+        self.q_sort = values
+
+        return self
+
+    def _search_body(self) -> dict:
+        """
+        Return the request body for a single page search; the aggregations are only sent by aggregate() and
+        profile(), the hits are all a page search returns
+        """
+        body = self.filter_data
+
+        if "aggs" not in body:
+            return body
+
+        # tied to the rendered body it was made from, as the cache key
+        if self.__search_body is None or self.__search_body[0] is not body:
+            self.__search_body = (body, {k: v for k, v in body.items() if k != "aggs"})
+
+        return self.__search_body[1]
+
+    def _stream_body(self, page_size: int) -> dict:
+        """
+        Return the request body for a point in time search, without the paging values
+        """
+        if not isinstance(page_size, int) or page_size < 1:
+            raise ValueError("page_size must be a positive integer")
+
+        body = {
+            k: v for k, v in self.filter_data.items() if k not in ("from", "size", "aggs")
+        }
+        body["size"] = page_size
+        # the pages are walked to the end; counting the hits on every page is wasted work
+        body["track_total_hits"] = False
+
+        if "sort" not in body or not body["sort"]:
+            body["sort"] = ["_shard_doc"]
+
+        return body
+
+    def _by_query_body(self) -> dict:
+        """
+        Return the body of a delete/update by query request; the query of this cursor, all documents without one
+        """
+        return {"query": self.bool_query.to_dict() if self.bool_query else {"match_all": {}}}
+
+    def _aggregation_body(self, aggs: dict = None) -> dict:
+        """
+        Return the request body for an aggregation only (size 0) search; aggs defaults to the added aggregations
+        """
+        body = {
+            k: v
+            for k, v in self.filter_data.items()
+            if k not in ("from", "size", "sort", "aggs")
+        }
+        body["size"] = 0
+
+        if aggs is None:
+            aggs = self._get_param("aggs")
+
+        if not aggs:
+            raise ValueError("no aggregations added to the query")
+
+        body["aggs"] = aggs
+
+        return body
+
+    @staticmethod
+    def _composite_aggregation(
+        sources, size: int, after: Optional[dict] = None
+    ) -> dict:
+        """
+        Return a composite aggregation; sources is a list of composite sources or a {name: field} dict, which is
+        expanded to terms sources
+        """
+        if isinstance(sources, dict):
+            sources = [{k: {"terms": {"field": v}}} for k, v in sources.items()]
+
+        composite = {"sources": sources, "size": size}
+
+        if after is not None:
+            composite["after"] = after
+
+        return {"composite": composite}
+
+    def _filter_path(self, paths: tuple) -> Optional[list]:
+        """
+        Return the filter_path request parameter for the given response fields, if trimming is enabled
+        """
+        return list(paths) if self.trim_response else None
+
+    def _parse_search_results(self, results) -> dict:
+        """
+        Parse the response of a single page search into the search result dict
+        """
+        ret_dict = {"skip": self.q_skip, "limit": self.q_limit}
+
+        if isinstance(results, str):
+            ret_dict["data"] = []
+            ret_dict["total"] = 0
+            ret_dict["total_relation"] = "eq"
+            return ret_dict
+
+        try:
+            # the total is there for an empty page (limit 0, or skipped past the last hit) as well
+            hits = results.get("hits", {})
+            count, relation = self._parse_total(hits.get("total"))
+            # a trimmed response of a search without hits has no hits.hits (nor hits, without a total)
+            results = [self._hit_source(x) for x in hits.get("hits", [])]
+
+            ret_dict["data"] = results
+            ret_dict["total"] = count
+            ret_dict["total_relation"] = relation
+
+        except Exception:
+            ret_dict["data"] = results
+            ret_dict["total"] = len(results)
+            ret_dict["total_relation"] = "eq"
+
+        return ret_dict
+
+    def _profile_body(self) -> dict:
+        """
+        Return the search body, with the aggregations, with profiling enabled
+        """
+        body = dict(self.filter_data)
+        body["profile"] = True
+
+        return body
+
+    @classmethod
+    def _parse_profile(cls, results) -> dict:
+        """
+        Summarise the profile section of a search response into a timing tree per shard and a list of all query
+        clauses, summed over the shards and sorted slowest first; times are in milliseconds
+        """
+        shards = []
+        clauses = {}
+
+        for shard in results.get("profile", {}).get("shards", []):
+            node, index, shard_id = cls._parse_shard_id(shard)
+
+            queries = []
+            query_ms = rewrite_ms = collector_ms = 0.0
+
+            for search in shard.get("searches", []):
+                for query in search.get("query", []):
+                    queries.append(cls._profile_tree(query, clauses))
+                    query_ms += query.get("time_in_nanos", 0) / 1e6
+
+                rewrite_ms += search.get("rewrite_time", 0) / 1e6
+                collector_ms += sum(
+                    x.get("time_in_nanos", 0) for x in search.get("collector", [])
+                ) / 1e6
+
+            for query in queries:
+                cls._profile_percent(query, query_ms)
+
+            shards.append(
+                {
+                    "node": node,
+                    "index": index,
+                    "shard": shard_id,
+                    "query_ms": round(query_ms, 3),
+                    "rewrite_ms": round(rewrite_ms, 3),
+                    "collector_ms": round(collector_ms, 3),
+                    "queries": queries,
+                }
+            )
+
+        for clause in clauses.values():
+            clause["time_ms"] = round(clause["time_ms"], 3)
+
+        return {
+            "took": results.get("took"),
+            "shards": sorted(shards, key=lambda x: x["query_ms"], reverse=True),
+            "clauses": sorted(clauses.values(), key=lambda x: x["time_ms"], reverse=True),
+        }
+
+    @staticmethod
+    def _parse_shard_id(shard: dict) -> tuple:
+        """
+        Return the (node, index, shard) of a profiled shard; older versions only give an id '[node][index][shard]'
+        """
+        if "index" in shard and "shard_id" in shard:
+            return shard.get("node_id"), shard["index"], shard["shard_id"]
+
+        parts = shard.get("id", "").strip("[]").split("][")
+
+        if len(parts) != 3:
+            return None, None, shard.get("id")
+
+        node, index, shard_id = parts
+
+        return node, index, int(shard_id) if shard_id.isdigit() else shard_id
+
+    @classmethod
+    def _profile_tree(cls, query: dict, clauses: dict) -> dict:
+        """
+        Return the timing tree of a profiled query, adding the time of every clause to clauses
+        """
+        time_ms = query.get("time_in_nanos", 0) / 1e6
+
+        key = (query.get("type"), query.get("description"))
+        clause = clauses.get(key)
+        if clause is None:
+            clause = clauses[key] = {
+                "type": key[0],
+                "description": key[1],
+                "time_ms": 0.0,
+                "shards": 0,
+            }
+        clause["time_ms"] += time_ms
+        clause["shards"] += 1
+
+        return {
+            "type": query.get("type"),
+            "description": query.get("description"),
+            "time_ms": round(time_ms, 3),
+            "children": [cls._profile_tree(x, clauses) for x in query.get("children", [])],
+        }
+
+    @classmethod
+    def _profile_percent(cls, query: dict, total_ms: float) -> None:
+        """
+        Add the share of the shard query time to a timing tree
+        """
+        query["percent"] = round(query["time_ms"] / total_ms * 100, 1) if total_ms else 0.0
+
+        for child in query["children"]:
+            cls._profile_percent(child, total_ms)
+
+    @staticmethod
+    def _parse_total(total) -> tuple:
+        """
+        Return the (total, relation) of a hits.total value; relation is 'eq' for an exact total, 'gte' for a lower
+        bound and None (with a None total) when hit tracking is disabled
+        """
+        if total is None:
+            return None, None
+
+        if isinstance(total, int):
+            return total, "eq"
+
+        return total["value"], total.get("relation", "eq")
+
+    @staticmethod
+    def _hit_source(hit: dict) -> dict:
+        """
+        Return the _source of a hit, merged with its doc value fields (if any)
+        """
+        if "fields" not in hit:
+            return hit.get("_source", {})
+
+        val_dict = dict(hit.get("_source", {}))
+        val_dict.update(hit["fields"])
+
+        return val_dict
+
+    @staticmethod
+    def _parse_hits(hits: list) -> list:
+        """
+        Merge the _id (and doc value fields) of each hit into its _source
+        """
+        ret_list = []
+        for x in hits:
+            val_dict = x.get("_source", {})
+            if "fields" in x:
+                val_dict.update(x["fields"])
+            val_dict.update({"_id": x["_id"]})
+            ret_list.append(val_dict)
+
+        return ret_list
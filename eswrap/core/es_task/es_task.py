@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+import warnings
+from typing import Callable, Optional
+
+try:
+    from elasticsearch.exceptions import GeneralAvailabilityWarning
+except ImportError:
+    # older clients do not warn about technical preview apis
+    GeneralAvailabilityWarning = None
+
+from eswrap.errors.tasks import TaskFailedError, TaskTimeoutError
+
+# task status counters reported by the _delete_by_query, _update_by_query and _reindex tasks
+PROGRESS_FIELDS = (
+    "total",
+    "created",
+    "updated",
+    "deleted",
+    "batches",
+    "version_conflicts",
+    "noops",
+)
+
+
+def _preview(api: Callable) -> Callable:
+    """
+    Wrap a technical preview api of the client (the tasks apis) so polling does not warn on every call; the
+    warning is raised when the api is called, so this works for the async client too
+    """
+
+    if GeneralAvailabilityWarning is None:
+        return api
+
+    def call(**kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", GeneralAvailabilityWarning)
+            return api(**kwargs)
+
+    return call
+
+
+class EsTask(object):
+    """
+    Handle of a task running on the cluster, as started by EsHandler.delete_by_query() or update_by_query() with
+    wait_for_completion=False
+    """
+
+    def __init__(self, es_handler, task_id: str, action: str):
+        """
+        Create a new EsTask object.
+
+        :param es_handler: The handler which started the task; its cache is invalidated when the task is done
+        :type es_handler: EsHandler
+        :param task_id: Id of the task ('node:number')
+        :type task_id: str
+        :param action: The api which started the task, e.g. 'delete_by_query'; used for rethrottle()
+        :type action: str
+        """
+        self.logger = logging.getLogger(__name__)
+
+        self.__es_handler = es_handler
+        self.__task_id = task_id
+        self.__action = action
+
+    @property
+    def task_id(self) -> str:
+        return self.__task_id
+
+    @property
+    def action(self) -> str:
+        return self.__action
+
+    @property
+    def es_handler(self):
+        return self.__es_handler
+
+    def status(self) -> dict:
+        """
+        Return the raw task status; 'completed' tells whether the task is done, 'response' or 'error' hold its
+        outcome once it is
+        """
+        return self.es_handler._perform(
+            "tasks_get",
+            _preview(self.es_handler.es_connection.tasks.get),
+            task_id=self.task_id,
+        ).body
+
+    def progress(self) -> dict:
+        """
+        Return the progress of the task: the document counters, the percentage done and whether it completed
+        """
+        return self._parse_progress(self.status())
+
+    def is_done(self) -> bool:
+        return bool(self.status().get("completed"))
+
+    def wait(self, timeout: Optional[float] = None, poll_interval: float = 1.0) -> dict:
+        """
+        Poll the task every poll_interval seconds until it completes and return its response. Raises a
+        TaskFailedError if the task failed (or reported failures) and a TaskTimeoutError if it is still running
+        after timeout seconds; the task keeps running on the cluster in that case.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            status = self.status()
+
+            if status.get("completed"):
+                self.es_handler.invalidate_cache()
+                return self._parse_result(status)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TaskTimeoutError(
+                    f"Task {self.task_id} still running after {timeout} seconds"
+                )
+
+            time.sleep(poll_interval)
+
+    def rethrottle(self, requests_per_second: float) -> dict:
+        """
+        Change the throttle of the running task; -1 disables throttling
+        """
+        return self.es_handler._perform(
+            f"{self.action}_rethrottle",
+            getattr(self.es_handler.es_connection, f"{self.action}_rethrottle"),
+            task_id=self.task_id,
+            requests_per_second=requests_per_second,
+        ).body
+
+    def cancel(self) -> dict:
+        """
+        Cancel the task; documents already processed stay deleted/updated
+        """
+        ret_data = self.es_handler._perform(
+            "tasks_cancel",
+            _preview(self.es_handler.es_connection.tasks.cancel),
+            task_id=self.task_id,
+        ).body
+
+        self.es_handler.invalidate_cache()
+
+        return ret_data
+
+    @staticmethod
+    def _parse_progress(status: dict) -> dict:
+        task_status = status.get("task", {}).get("status", {})
+
+        ret_dict = {x: task_status.get(x, 0) for x in PROGRESS_FIELDS}
+
+        processed = sum(
+            task_status.get(x, 0)
+            for x in ("created", "updated", "deleted", "noops", "version_conflicts")
+        )
+        ret_dict["percent"] = (
+            round(processed / ret_dict["total"] * 100, 1) if ret_dict["total"] else None
+        )
+        ret_dict["requests_per_second"] = task_status.get("requests_per_second")
+        ret_dict["running_seconds"] = (
+            status.get("task", {}).get("running_time_in_nanos", 0) / 1e9
+        )
+        ret_dict["completed"] = bool(status.get("completed"))
+
+        return ret_dict
+
+    def _parse_result(self, status: dict) -> dict:
+        if "error" in status:
+            raise TaskFailedError(f"Task {self.task_id} failed: {status['error']}")
+
+        response = status.get("response", {})
+
+        if response.get("failures"):
+            raise TaskFailedError(
+                f"Task {self.task_id} finished with {len(response['failures'])} failure(s): "
+                f"{response['failures'][:3]}"
+            )
+
+        return response
+
+    def __repr__(self):
+        """return a string representation of the obj EsTask"""
+        return "<< EsTask: {} {} >>".format(self.action, self.task_id)
+
+
+class AsyncEsTask(EsTask):
+    """
+    The asyncio counterpart of the EsTask, as started by the AsyncEsHandler
+    """
+
+    async def status(self) -> dict:
+        return (
+            await self.es_handler._perform(
+                "tasks_get",
+                _preview(self.es_handler.es_connection.tasks.get),
+                task_id=self.task_id,
+            )
+        ).body
+
+    async def progress(self) -> dict:
+        return self._parse_progress(await self.status())
+
+    async def is_done(self) -> bool:
+        return bool((await self.status()).get("completed"))
+
+    async def wait(
+        self, timeout: Optional[float] = None, poll_interval: float = 1.0
+    ) -> dict:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            status = await self.status()
+
+            if status.get("completed"):
+                self.es_handler.invalidate_cache()
+                return self._parse_result(status)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TaskTimeoutError(
+                    f"Task {self.task_id} still running after {timeout} seconds"
+                )
+
+            await asyncio.sleep(poll_interval)
+
+    async def rethrottle(self, requests_per_second: float) -> dict:
+        return (
+            await self.es_handler._perform(
+                f"{self.action}_rethrottle",
+                getattr(self.es_handler.es_connection, f"{self.action}_rethrottle"),
+                task_id=self.task_id,
+                requests_per_second=requests_per_second,
+            )
+        ).body
+
+    async def cancel(self) -> dict:
+        ret_data = (
+            await self.es_handler._perform(
+                "tasks_cancel",
+                _preview(self.es_handler.es_connection.tasks.cancel),
+                task_id=self.task_id,
+            )
+        ).body
+
+        self.es_handler.invalidate_cache()
+
+        return ret_data
+
+    def __repr__(self):
+        """return a string representation of the obj AsyncEsTask"""
+        return "<< AsyncEsTask: {} {} >>".format(self.action, self.task_id)
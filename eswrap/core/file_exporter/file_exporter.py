@@ -0,0 +1,165 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from typing import Iterable, List, Optional, Union, BinaryIO, TextIO
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+
+class FileExporter(object):
+    """
+    The FileExporter; writes a stream of documents to a NDJSON or CSV file with bounded memory
+    """
+
+    def __init__(
+        self,
+        format: str = "ndjson",
+        compress: bool = False,
+        fields: Optional[List[str]] = None,
+        batch_size: int = 1000,
+        buffer_size: int = 1024 * 1024,
+    ):
+        """
+        Create a new FileExporter object.
+
+        :param format: Output format; 'ndjson' or 'csv'
+        :type format: str
+        :param compress: gzip the output
+        :type compress: bool
+        :param fields: CSV columns; defaults to the fields of the first document
+        :type fields: list
+        :param batch_size: Number of documents serialized per write
+        :type batch_size: int
+        :param buffer_size: Size in bytes of the write buffer of files opened by path
+        :type buffer_size: int
+        """
+        if format not in SUPPORTED_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(SUPPORTED_FORMATS)}")
+
+        self.logger = logging.getLogger(__name__)
+
+        self.format = format
+        self.compress = compress
+        self.fields = fields
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+
+    def write(
+        self,
+        documents: Iterable[dict],
+        path_or_fileobj: Union[str, os.PathLike, BinaryIO, TextIO],
+    ) -> dict:
+        """
+        Write the documents to a path or an open file object; file objects are flushed but not closed.
+
+        Returns the number of documents, the (uncompressed) bytes written, the elapsed time and the throughput.
+        """
+        start = time.perf_counter()
+
+        if isinstance(path_or_fileobj, (str, os.PathLike)):
+            with open(path_or_fileobj, "wb", buffering=self.buffer_size) as fdesc:
+                count, written = self.__write_to(documents, fdesc)
+        else:
+            count, written = self.__write_to(documents, path_or_fileobj)
+
+        seconds = time.perf_counter() - start
+
+        ret_dict = {
+            "documents": count,
+            "bytes": written,
+            "seconds": seconds,
+            "documents_per_second": count / seconds if seconds > 0 else 0.0,
+        }
+
+        self.logger.debug(f"Exported {count} documents ({written} bytes) in {seconds:.3f}s")
+
+        return ret_dict
+
+    def __write_to(self, documents: Iterable[dict], fdesc) -> tuple:
+        text_mode = isinstance(fdesc, io.TextIOBase)
+
+        if text_mode and self.compress:
+            raise ValueError("compressed output needs a path or a binary file object")
+
+        sink = gzip.GzipFile(fileobj=fdesc, mode="wb") if self.compress else fdesc
+
+        count = 0
+        written = 0
+
+        try:
+            batches = (
+                self.__ndjson_batches(documents)
+                if self.format == "ndjson"
+                else self.__csv_batches(documents)
+            )
+
+            for batch, size in batches:
+                data = batch.encode("utf-8")
+                sink.write(batch if text_mode else data)
+                count += size
+                written += len(data)
+        finally:
+            if self.compress:
+                # closing the GzipFile writes the trailer, the underlying file object stays open
+                sink.close()
+            fdesc.flush()
+
+        return count, written
+
+    def __ndjson_batches(self, documents: Iterable[dict]):
+        batch = []
+
+        for document in documents:
+            batch.append(json.dumps(document, default=str, ensure_ascii=False))
+
+            if len(batch) == self.batch_size:
+                yield "\n".join(batch) + "\n", len(batch)
+                batch = []
+
+        if batch:
+            yield "\n".join(batch) + "\n", len(batch)
+
+    def __csv_batches(self, documents: Iterable[dict]):
+        buffer = io.StringIO()
+        writer = None
+        size = 0
+
+        for document in documents:
+            if writer is None:
+                writer = csv.DictWriter(
+                    buffer,
+                    fieldnames=self.fields or list(document.keys()),
+                    extrasaction="ignore",
+                    restval="",
+                )
+                writer.writeheader()
+
+            writer.writerow(
+                {
+                    k: json.dumps(v, default=str, ensure_ascii=False)
+                    if isinstance(v, (dict, list))
+                    else v
+                    for k, v in document.items()
+                }
+            )
+            size += 1
+
+            if size == self.batch_size:
+                yield buffer.getvalue(), size
+                buffer.seek(0)
+                buffer.truncate()
+                size = 0
+
+        if writer is None and self.fields:
+            csv.writer(buffer).writerow(self.fields)
+
+        if buffer.tell():
+            yield buffer.getvalue(), size
+
+    def __repr__(self):
+        """return a string representation of the obj FileExporter"""
+        return "<< FileExporter: {} >>".format(self.format)
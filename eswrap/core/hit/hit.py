@@ -0,0 +1,86 @@
+from typing import Any, Optional
+
+
+class Hit(object):
+    """
+    Read only view of a single search hit; wraps the decoded hit without copying it. Keys resolve the same way as
+    the documents of EsCursor.execute(): '_id', then the doc value fields, then the _source.
+    """
+
+    __slots__ = ("__hit",)
+
+    def __init__(self, hit: dict):
+        """
+        Create a new Hit object.
+
+        :param hit: A hit of a search response (an element of hits.hits)
+        :type hit: dict
+        """
+        self.__hit = hit
+
+    @property
+    def id(self) -> str:
+        return self.__hit["_id"]
+
+    @property
+    def index(self) -> Optional[str]:
+        return self.__hit.get("_index")
+
+    @property
+    def score(self) -> Optional[float]:
+        return self.__hit.get("_score")
+
+    @property
+    def sort(self) -> Optional[list]:
+        return self.__hit.get("sort")
+
+    @property
+    def source(self) -> dict:
+        """The _source of the hit; shared with the response, do not modify"""
+        return self.__hit.get("_source", {})
+
+    @property
+    def fields(self) -> dict:
+        """The doc value fields of the hit; shared with the response, do not modify"""
+        return self.__hit.get("fields", {})
+
+    @property
+    def raw(self) -> dict:
+        return self.__hit
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> dict:
+        """
+        Return a copy of the _source merged with the doc value fields and the _id
+        """
+        val_dict = dict(self.source)
+        val_dict.update(self.fields)
+        val_dict["_id"] = self.id
+
+        return val_dict
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "_id":
+            return self.__hit["_id"]
+
+        fields = self.__hit.get("fields")
+        if fields is not None and key in fields:
+            return fields[key]
+
+        return self.__hit.get("_source", {})[key]
+
+    def __contains__(self, key: str) -> bool:
+        return (
+            key == "_id"
+            or key in self.__hit.get("fields", ())
+            or key in self.__hit.get("_source", ())
+        )
+
+    def __repr__(self):
+        """return a string representation of the obj Hit"""
+        return "<< Hit: {} >>".format(self.__hit.get("_id"))
@@ -1,48 +1,250 @@
 import logging
-from typing import List
+import threading
+import time
+from typing import Callable, List, Dict, Optional
 
 import elastic_transport
 from elasticsearch import Elasticsearch
 
 from eswrap.core.es_index.es_index import EsIndex
+from eswrap.core.metrics.metrics import MetricsHook, perform_request
+from eswrap.core.write_controller.write_controller import WriteController
+
+
+# resolve index parameters listing the names of the open indexes; resolving only reads the cluster metadata, where
+# _cat/indices gathers the stats of every shard and indices.get() the mappings and settings of every index
+RESOLVE_INDEX_PARAMS = {"name": "*", "expand_wildcards": "open"}
 
 
 class IndexList(object):
-    def __init__(self, es_client: Elasticsearch):
+    def __init__(
+        self,
+        es_client: Elasticsearch,
+        ttl: Optional[float] = 60,
+        metrics: Optional[MetricsHook] = None,
+        write_controller: Optional[WriteController] = None,
+    ):
+        """
+        Registry of the indexes on the cluster keyed by name. The registry is refreshed from the cluster when it
+        is older than ttl seconds (never if ttl is None); in between, changes made through the EsWrap are applied
+        with add_index() and remove_index(). The handlers of all indexes report to the metrics hook (if set) and
+        write through the write controller (if set).
+
+        The registry is thread safe: changes replace the index dict rather than modifying it (so index_dict and
+        indexes are consistent snapshots), concurrent refreshes of a stale registry hit the cluster once and
+        indexes added or removed while a refresh runs stay added or removed.
+        """
         self.logger = logging.getLogger(__name__)
 
-        self.__indexes = []
+        self.__lock = threading.Lock()
+        self.__refresh_lock = threading.Lock()
+        self.__indexes = {}
+        # changes are numbered; while refreshes run, the last change per name is kept to merge into their result
+        self.__version = 0
+        self.__refreshing = 0
+        self.__changes = {}
         self.__es_client = es_client
 
+        self.ttl = ttl
+        self.__metrics = metrics
+        self.__write_controller = write_controller
+        self.__last_refresh = None
+
     @property
     def es_client(self):
         return self.__es_client
 
     @property
-    def index_list(self):
-        return list(self.es_client.indices.get(index="*").keys())
+    def metrics(self) -> Optional[MetricsHook]:
+        return self.__metrics
+
+    @metrics.setter
+    def metrics(self, val: Optional[MetricsHook]):
+        with self.__lock:
+            self.__metrics = val
+
+            for index in self.__indexes.values():
+                index().metrics = val
+
+    @property
+    def write_controller(self) -> Optional[WriteController]:
+        return self.__write_controller
+
+    @write_controller.setter
+    def write_controller(self, val: Optional[WriteController]):
+        with self.__lock:
+            self.__write_controller = val
+
+            for index in self.__indexes.values():
+                index().write_controller = val
+
+    @property
+    def index_list(self) -> List[str]:
+        return self._index_names(
+            perform_request(
+                self.metrics,
+                self.es_client.transport.serializers.get_serializer("application/json"),
+                "resolve_index",
+                "*",
+                self.es_client.indices.resolve_index,
+                **RESOLVE_INDEX_PARAMS,
+            )
+        )
+
+    @staticmethod
+    def _index_names(response) -> List[str]:
+        """
+        Return the index names of a resolve index response made with RESOLVE_INDEX_PARAMS
+        """
+        return [x["name"] for x in response.get("indices", [])]
+
+    @staticmethod
+    def _refreshed(indexes: dict, index_names: List[str], factory: Callable) -> dict:
+        """
+        Return the registry of the listed index names; the existing entries of indexes are kept, so their handlers
+        survive a refresh, and factory(name) makes the entries of new indexes
+        """
+        return {x: indexes[x] if x in indexes else factory(x) for x in index_names}
 
     @property
     def indexes(self) -> List[EsIndex]:
-        return self.__indexes
+        return list(self.__indexes.values())
 
     @indexes.setter
     def indexes(self, val: EsIndex):
-        self.__indexes.append(val)
+        with self.__lock:
+            self.__indexes = {**self.__indexes, val.name: val}
+            self.__changed(val.name, val)
+
+    @property
+    def index_dict(self) -> Dict[str, EsIndex]:
+        return self.__indexes
+
+    @property
+    def stale(self) -> bool:
+        if self.__last_refresh is None:
+            return True
+
+        if self.ttl is None:
+            return False
+
+        return time.monotonic() - self.__last_refresh > self.ttl
 
     def get_index_list(self):
         return self.indexes
 
+    def get(self, index_name: str) -> Optional[EsIndex]:
+        return self.__indexes.get(index_name)
+
+    def prepare_index(self, index_name: str) -> EsIndex:
+        """
+        Return the EsIndex of index_name, or a new unregistered one for an index which may not exist yet; register
+        it with add_index() once a write to it succeeded
+        """
+        index = self.__indexes.get(index_name)
+
+        if index is not None:
+            return index
+
+        return EsIndex(index_name, self.es_client, self.metrics, self.write_controller)
+
+    def add_index(self, index_name: str, index: Optional[EsIndex] = None) -> EsIndex:
+        registered = self.__indexes.get(index_name)
+
+        if registered is not None:
+            return registered
+
+        with self.__lock:
+            # another thread may have added it in the meantime
+            if index_name not in self.__indexes:
+                self.__indexes = {
+                    **self.__indexes,
+                    index_name: index
+                    if index is not None
+                    else EsIndex(
+                        index_name, self.es_client, self.metrics, self.write_controller
+                    ),
+                }
+                self.__changed(index_name, self.__indexes[index_name])
+
+            return self.__indexes[index_name]
+
+    def remove_index(self, index_name: str) -> None:
+        with self.__lock:
+            if index_name in self.__indexes:
+                self.__indexes = {
+                    k: v for k, v in self.__indexes.items() if k != index_name
+                }
+
+            # also when not registered; a running refresh may have listed it before it was deleted
+            self.__changed(index_name, None)
+
+    def __changed(self, index_name: str, index: Optional[EsIndex]) -> None:
+        # called with the lock held; index is None for a removed index
+        self.__version += 1
+
+        if self.__refreshing:
+            self.__changes[index_name] = (self.__version, index)
+
     def fill_index_list(self):
+        with self.__lock:
+            self.__refreshing += 1
+            since = self.__version
+
         try:
-            for each in self.index_list:
-                self.indexes = EsIndex(each, self.es_client)
-        except elastic_transport.ConnectionError as err:
-            self.logger.warning(
-                f"Cannot connect to elasticsearch, error encountered: {err}"
-            )
-        except Exception as err:
-            self.logger.error(f"Uncaught exception encountered: {err}")
+            try:
+                index_names = self.index_list
+            except elastic_transport.ConnectionError as err:
+                self.logger.warning(
+                    f"Cannot connect to elasticsearch, error encountered: {err}"
+                )
+                return
+            except Exception as err:
+                self.logger.error(f"Uncaught exception encountered: {err}")
+                return
+
+            with self.__lock:
+                indexes = self._refreshed(
+                    self.__indexes,
+                    index_names,
+                    lambda x: EsIndex(
+                        x, self.es_client, self.metrics, self.write_controller
+                    ),
+                )
+
+                # the index names were listed before the changes made since the refresh started
+                for index_name, (version, index) in self.__changes.items():
+                    if version <= since:
+                        continue
+
+                    if index is None:
+                        indexes.pop(index_name, None)
+                    else:
+                        indexes[index_name] = index
+
+                self.__indexes = indexes
+                self.__last_refresh = time.monotonic()
+        finally:
+            with self.__lock:
+                self.__refreshing -= 1
+
+                if not self.__refreshing:
+                    self.__changes = {}
+
+    def refresh_if_stale(self):
+        if not self.stale:
+            return
+
+        with self.__refresh_lock:
+            # the threads waiting for the lock find the registry refreshed
+            if self.stale:
+                self.fill_index_list()
+
+    def __len__(self):
+        return len(self.__indexes)
+
+    def __contains__(self, index_name: str):
+        return index_name in self.__indexes
 
     def __repr__(self):
         return "<IndexList>"
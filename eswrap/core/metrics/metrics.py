@@ -0,0 +1,424 @@
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+# response fields needed for the server side metrics; added to the filter_path of trimmed requests when a hook is set
+METRICS_FILTER_PATH = ("took", "timed_out", "_shards.failed")
+
+# upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestEvent(NamedTuple):
+    """
+    A single request made by eswrap; took is the server side time in seconds (None if not reported), error the
+    name of the exception raised by the client (None on success)
+    """
+
+    operation: str
+    index: str
+    seconds: float
+    took: Optional[float]
+    request_bytes: int
+    response_bytes: int
+    error: Optional[str]
+    timed_out: bool
+    shard_failures: int
+
+
+class MetricsHook(object):
+    """
+    Interface for receiving a RequestEvent per request made through an EsWrap, EsHandler or EsCursor; subclass and
+    override on_request(). on_request() is called on the requesting thread and must not raise.
+    """
+
+    def on_request(self, event: RequestEvent) -> None:
+        pass
+
+
+def request_size(serializer, kwargs: dict) -> int:
+    """
+    Return the size in bytes of the request body given in the api kwargs
+    """
+    if "operations" in kwargs or "searches" in kwargs:
+        lines = kwargs.get("operations", kwargs.get("searches"))
+        return sum(
+            len(x if isinstance(x, bytes) else serializer.dumps(x)) + 1 for x in lines
+        )
+
+    for key in ("body", "document", "doc", "query"):
+        if kwargs.get(key) is not None:
+            return len(serializer.dumps(kwargs[key]))
+
+    return 0
+
+
+def response_event(
+    operation: str,
+    index: str,
+    seconds: float,
+    request_bytes: int,
+    response,
+    serializer,
+) -> RequestEvent:
+    """
+    Build the RequestEvent of a successful request from the api response
+    """
+    body = response.body if hasattr(response, "body") else response
+
+    try:
+        response_bytes = int(response.meta.headers["content-length"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        # chunked or compressed responses have no usable content-length
+        response_bytes = len(serializer.dumps(body)) if body is not None else 0
+
+    took = timed_out = shard_failures = None
+
+    if isinstance(body, dict):
+        took = body.get("took")
+        timed_out = body.get("timed_out")
+        shard_failures = body.get("_shards", {}).get("failed")
+
+    return RequestEvent(
+        operation=operation,
+        index=index,
+        seconds=seconds,
+        took=took / 1000 if isinstance(took, (int, float)) else None,
+        request_bytes=request_bytes,
+        response_bytes=response_bytes,
+        error=None,
+        timed_out=bool(timed_out),
+        shard_failures=shard_failures or 0,
+    )
+
+
+def error_event(
+    operation: str, index: str, seconds: float, request_bytes: int, err: Exception
+) -> RequestEvent:
+    return RequestEvent(
+        operation=operation,
+        index=index,
+        seconds=seconds,
+        took=None,
+        request_bytes=request_bytes,
+        response_bytes=0,
+        error=type(err).__name__,
+        timed_out=False,
+        shard_failures=0,
+    )
+
+
+def perform_request(
+    hook: Optional[MetricsHook],
+    serializer,
+    operation: str,
+    index: str,
+    api: Callable,
+    /,
+    **kwargs,
+):
+    """
+    Call the client api with kwargs and report the request to hook; without a hook the api is called directly. The
+    leading arguments are positional only, so they never clash with the api kwargs (e.g. index).
+    """
+    if hook is None:
+        return api(**kwargs)
+
+    request_bytes = request_size(serializer, kwargs)
+    start = time.perf_counter()
+
+    try:
+        response = api(**kwargs)
+    except Exception as err:
+        hook.on_request(
+            error_event(operation, index, time.perf_counter() - start, request_bytes, err)
+        )
+        raise
+
+    hook.on_request(
+        response_event(
+            operation,
+            index,
+            time.perf_counter() - start,
+            request_bytes,
+            response,
+            serializer,
+        )
+    )
+
+    return response
+
+
+async def async_perform_request(
+    hook: Optional[MetricsHook],
+    serializer,
+    operation: str,
+    index: str,
+    api: Callable,
+    /,
+    **kwargs,
+):
+    """
+    The asyncio counterpart of perform_request
+    """
+    if hook is None:
+        return await api(**kwargs)
+
+    request_bytes = request_size(serializer, kwargs)
+    start = time.perf_counter()
+
+    try:
+        response = await api(**kwargs)
+    except Exception as err:
+        hook.on_request(
+            error_event(operation, index, time.perf_counter() - start, request_bytes, err)
+        )
+        raise
+
+    hook.on_request(
+        response_event(
+            operation,
+            index,
+            time.perf_counter() - start,
+            request_bytes,
+            response,
+            serializer,
+        )
+    )
+
+    return response
+
+
+class _Series(object):
+    __slots__ = (
+        "count",
+        "seconds",
+        "buckets",
+        "took",
+        "took_count",
+        "request_bytes",
+        "response_bytes",
+        "timeouts",
+        "shard_failures",
+        "errors",
+    )
+
+    def __init__(self, buckets: int):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * buckets
+        self.took = 0.0
+        self.took_count = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.timeouts = 0
+        self.shard_failures = 0
+        self.errors = {}
+
+
+class MetricsCollector(MetricsHook):
+    """
+    In process MetricsHook keeping a latency histogram, byte counters, server side took time, timeouts, shard
+    failures and errors per (operation, index); thread safe
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Create a new MetricsCollector object.
+
+        :param buckets: Upper bounds in seconds of the latency histogram buckets
+        :type buckets: tuple
+        """
+        self.logger = logging.getLogger(__name__)
+
+        self.__buckets = tuple(sorted(buckets))
+        self.__series: Dict[Tuple[str, str], _Series] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def buckets(self) -> Tuple[float, ...]:
+        return self.__buckets
+
+    def on_request(self, event: RequestEvent) -> None:
+        bucket = bisect.bisect_left(self.__buckets, event.seconds)
+
+        with self.__lock:
+            key = (event.operation, event.index)
+
+            series = self.__series.get(key)
+            if series is None:
+                series = self.__series[key] = _Series(len(self.__buckets))
+
+            series.count += 1
+            series.seconds += event.seconds
+            if bucket < len(self.__buckets):
+                series.buckets[bucket] += 1
+
+            if event.took is not None:
+                series.took += event.took
+                series.took_count += 1
+
+            series.request_bytes += event.request_bytes
+            series.response_bytes += event.response_bytes
+            series.timeouts += event.timed_out
+            series.shard_failures += event.shard_failures
+
+            if event.error is not None:
+                series.errors[event.error] = series.errors.get(event.error, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        """
+        Return a copy of the metrics as {index: {operation: metrics}}; the histogram is cumulative, keyed by
+        upper bound
+        """
+        ret_dict = {}
+
+        with self.__lock:
+            for (operation, index), series in self.__series.items():
+                cumulative = 0
+                histogram = {}
+                for bound, count in zip(self.__buckets, series.buckets):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                histogram[float("inf")] = series.count
+
+                ret_dict.setdefault(index, {})[operation] = {
+                    "count": series.count,
+                    "seconds": series.seconds,
+                    "histogram": histogram,
+                    "took_seconds": series.took,
+                    "took_count": series.took_count,
+                    "request_bytes": series.request_bytes,
+                    "response_bytes": series.response_bytes,
+                    "timeouts": series.timeouts,
+                    "shard_failures": series.shard_failures,
+                    "errors": dict(series.errors),
+                }
+
+        return ret_dict
+
+    def reset(self):
+        with self.__lock:
+            self.__series = {}
+
+    def __repr__(self):
+        """return a string representation of the obj MetricsCollector"""
+        return "<< MetricsCollector: {} series >>".format(len(self.__series))
+
+
+class PrometheusExporter(object):
+    """
+    Renders the metrics of a MetricsCollector in the Prometheus text exposition format
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, collector: MetricsCollector, namespace: str = "eswrap"):
+        """
+        Create a new PrometheusExporter object.
+
+        :param collector: The collector to export
+        :type collector: MetricsCollector
+        :param namespace: Prefix of all metric names
+        :type namespace: str
+        """
+        self.logger = logging.getLogger(__name__)
+
+        self.collector = collector
+        self.namespace = namespace
+
+    @staticmethod
+    def __labels(**labels) -> str:
+        escaped = (
+            (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in labels.items()
+        )
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    @staticmethod
+    def __bound(bound: float) -> str:
+        return "+Inf" if bound == float("inf") else repr(bound)
+
+    def render(self) -> str:
+        """
+        Return the metrics as Prometheus text exposition
+        """
+        ns = self.namespace
+        snapshot = self.collector.snapshot()
+
+        series = [
+            (self.__labels(operation=operation, index=index), operation, index, values)
+            for index, operations in sorted(snapshot.items())
+            for operation, values in sorted(operations.items())
+        ]
+
+        lines = [
+            f"# HELP {ns}_request_duration_seconds Wall clock time of requests to elasticsearch.",
+            f"# TYPE {ns}_request_duration_seconds histogram",
+        ]
+        for labels, operation, index, values in series:
+            for bound, count in values["histogram"].items():
+                bucket_labels = self.__labels(
+                    operation=operation, index=index, le=self.__bound(bound)
+                )
+                lines.append(f"{ns}_request_duration_seconds_bucket{bucket_labels} {count}")
+            lines.append(f"{ns}_request_duration_seconds_sum{labels} {values['seconds']}")
+            lines.append(f"{ns}_request_duration_seconds_count{labels} {values['count']}")
+
+        counters = (
+            ("request_took_seconds_total", "took_seconds", "Server side time (took) of requests."),
+            ("requests_with_took_total", "took_count", "Requests which reported a server side took time."),
+            ("request_bytes_total", "request_bytes", "Bytes sent in request bodies."),
+            ("response_bytes_total", "response_bytes", "Bytes received in response bodies."),
+            ("request_timeouts_total", "timeouts", "Requests which timed out on the server side."),
+            ("shard_failures_total", "shard_failures", "Shard failures reported in responses."),
+        )
+
+        for name, key, description in counters:
+            lines.append(f"# HELP {ns}_{name} {description}")
+            lines.append(f"# TYPE {ns}_{name} counter")
+            for labels, _, _, values in series:
+                lines.append(f"{ns}_{name}{labels} {values[key]}")
+
+        lines.append(f"# HELP {ns}_request_errors_total Requests which raised an error, by error type.")
+        lines.append(f"# TYPE {ns}_request_errors_total counter")
+        for _, operation, index, values in series:
+            for error, count in sorted(values["errors"].items()):
+                error_labels = self.__labels(operation=operation, index=index, error=error)
+                lines.append(f"{ns}_request_errors_total{error_labels} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, addr: str = "") -> ThreadingHTTPServer:
+        """
+        Serve the metrics over http on a daemon thread; call shutdown() on the returned server to stop it
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = exporter.render().encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", exporter.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                exporter.logger.debug(format % args)
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+
+        threading.Thread(
+            target=server.serve_forever, name="eswrap-metrics", daemon=True
+        ).start()
+
+        return server
+
+    def __repr__(self):
+        """return a string representation of the obj PrometheusExporter"""
+        return "<< PrometheusExporter: {} >>".format(self.namespace)
@@ -0,0 +1,133 @@
+import collections
+import json
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+
+class QueryCache(object):
+    """
+    The QueryCache; a thread safe LRU cache with TTL eviction for search results, keyed on the request body
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 60):
+        """
+        Create a new QueryCache object.
+
+        :param max_size: Maximum number of cached results; the least recently used result is evicted first
+        :type max_size: int
+        :param ttl: Number of seconds a result stays valid; None keeps results until evicted or invalidated
+        :type ttl: float
+        """
+        if not isinstance(max_size, int) or max_size < 1:
+            raise ValueError("max_size must be a positive integer")
+
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.__lock = threading.Lock()
+        self.__entries = collections.OrderedDict()
+        # bumped by every invalidate(), to spot results fetched while the cache was invalidated
+        self.__generation = 0
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+
+    @property
+    def generation(self) -> int:
+        """
+        The number of invalidations so far; read it on a miss, before fetching the result, and pass it to set()
+        """
+        return self.__generation
+
+    @property
+    def stats(self) -> dict:
+        total = self.__hits + self.__misses
+
+        return {
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+            "size": len(self),
+            "max_size": self.max_size,
+            "hit_ratio": self.__hits / total if total else 0.0,
+        }
+
+    @staticmethod
+    def make_key(body: dict) -> str:
+        """
+        Canonicalise a request body into a cache key; key order does not matter
+        """
+        return json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Return a (hit, value) tuple for the given key
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is not None and (
+                self.ttl is None or time.monotonic() - entry[0] <= self.ttl
+            ):
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                return True, entry[1]
+
+            if entry is not None:
+                # expired
+                del self.__entries[key]
+                self.__evictions += 1
+
+            self.__misses += 1
+            return False, None
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Store the value for the given key; if the generation it was fetched in is given and the cache has been
+        invalidated since, the value may be stale and is dropped instead
+        """
+        with self.__lock:
+            if generation is not None and generation != self.__generation:
+                return
+
+            self.__entries[key] = (time.monotonic(), value)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self) -> None:
+        """
+        Drop all cached results
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__generation += 1
+
+    def reset_stats(self) -> None:
+        with self.__lock:
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __repr__(self):
+        """return a string representation of the obj QueryCache"""
+        return "<< QueryCache: {}/{} >>".format(len(self), self.max_size)
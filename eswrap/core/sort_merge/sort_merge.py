@@ -0,0 +1,83 @@
+import heapq
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from eswrap.core.hit.hit import Hit
+
+
+class SortValue(object):
+    """
+    Sort value of a hit for a single sort field, ordered in the direction of the field; missing values (None) sort
+    last in both directions, as they do on the cluster by default
+    """
+
+    __slots__ = ("value", "descending")
+
+    def __init__(self, value, descending: bool):
+        self.value = value
+        self.descending = descending
+
+    def __eq__(self, other: "SortValue") -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: "SortValue") -> bool:
+        if self.value is None or other.value is None:
+            return self.value is not None and other.value is None
+
+        if self.descending:
+            return self.value > other.value
+
+        return self.value < other.value
+
+
+def sort_directions(sort: Optional[list]) -> List[Tuple[str, bool]]:
+    """
+    Return the (field, descending) pairs of a search sort, e.g. ["date", {"price": "desc"}, {"_score": {}}]; a
+    search without sort is sorted by descending score
+    """
+    if not sort:
+        return [("_score", True)]
+
+    if isinstance(sort, (str, dict)):
+        sort = [sort]
+
+    ret_list = []
+
+    for entry in sort:
+        if isinstance(entry, str):
+            field, order = entry, None
+        else:
+            field, order = next(iter(entry.items()))
+            if isinstance(order, dict):
+                order = order.get("order")
+
+        if order is None:
+            # only the score sorts descending by default
+            order = "desc" if field == "_score" else "asc"
+
+        ret_list.append((field, order == "desc"))
+
+    return ret_list
+
+
+def sort_key(sort: Optional[list]) -> Callable[[Hit], tuple]:
+    """
+    Return the key function ordering Hit views the way the cluster ordered them for the given sort; hits of a
+    sorted search are keyed on their sort values, hits of an unsorted one on their score
+    """
+    directions = sort_directions(sort)
+
+    if not sort:
+        return lambda hit: (SortValue(hit.score, True),)
+
+    return lambda hit: tuple(
+        SortValue(value, descending)
+        for value, (_, descending) in zip(hit.sort or (), directions)
+    )
+
+
+def merge_hits(pages: Iterable[List[Hit]], sort: Optional[list]) -> Iterable[Hit]:
+    """
+    Merge pages of hits, each already ordered by the cluster with the same sort (e.g. the same search on several
+    indexes), into a single ordered stream
+    """
+    return heapq.merge(*pages, key=sort_key(sort))
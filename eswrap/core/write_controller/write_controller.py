@@ -0,0 +1,360 @@
+import collections
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from elastic_transport.client_utils import DEFAULT
+from elasticsearch import ApiError, Elasticsearch
+
+# statuses meaning the cluster is overloaded; the request can be retried later
+RETRY_STATUSES = (429, 503)
+
+# statuses the client keeps retrying on its own (right away) for controlled writes; the client default without
+# the RETRY_STATUSES, which are left to the controller
+TRANSPORT_RETRY_STATUSES = tuple(
+    x for x in (429, 502, 503, 504) if x not in RETRY_STATUSES
+)
+
+
+def _status(err: Exception) -> Optional[int]:
+    try:
+        return err.meta.status
+    except AttributeError:
+        return None
+
+
+class WriteController(object):
+    """
+    Write side flow control; retries writes rejected because the cluster is overloaded (429/503) with exponential
+    backoff and full jitter, and adapts the bulk chunk size and concurrency to the observed rejections and latency
+    (additive increase, multiplicative decrease). One controller can be shared by all handlers writing to the same
+    cluster, so they back off together. Thread safe.
+
+    Bulk requests are sent one at a time by default, so the documents of a bulk write are applied in input order.
+    A max_concurrency above 1 lets the controller send several chunks at once when the cluster keeps up, for
+    more throughput at the cost of ordering: chunks, and the items of a chunk retried after a rejection, can then
+    be applied after later chunks, so an older version of a repeated _id can overwrite a newer one and partial
+    updates can land out of order. Only raise it for writes without repeated ids, or where the order does not
+    matter. Even sent one at a time, an _id repeated within a single chunk can end up out of order when only its
+    earlier item is rejected and retried.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 8,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 60.0,
+        chunk_size: int = 500,
+        min_chunk_size: int = 10,
+        max_chunk_size: int = 5000,
+        concurrency: int = 1,
+        max_concurrency: int = 1,
+        target_latency: float = 2.0,
+        throughput_window: float = 30.0,
+    ):
+        """
+        Create a new WriteController object.
+
+        :param max_retries: Retries of a rejected request (or of the rejected items of a bulk request)
+        :type max_retries: int
+        :param initial_backoff: Backoff in seconds after the first rejection; doubled after every next one
+        :type initial_backoff: float
+        :param max_backoff: Maximum backoff in seconds
+        :type max_backoff: float
+        :param chunk_size: Initial number of documents per bulk request
+        :type chunk_size: int
+        :param min_chunk_size: Lower bound of the adaptive chunk size
+        :type min_chunk_size: int
+        :param max_chunk_size: Upper bound of the adaptive chunk size
+        :type max_chunk_size: int
+        :param concurrency: Initial number of concurrent bulk requests
+        :type concurrency: int
+        :param max_concurrency: Upper bound of the adaptive concurrency; above 1 writes are no longer ordered
+        :type max_concurrency: int
+        :param target_latency: Bulk requests slower than this (seconds) shrink the chunk size
+        :type target_latency: float
+        :param throughput_window: Period in seconds over which the throughput is reported
+        :type throughput_window: float
+        """
+        if not 1 <= min_chunk_size <= chunk_size <= max_chunk_size:
+            raise ValueError("chunk sizes must satisfy 1 <= min <= initial <= max")
+
+        if not 1 <= concurrency <= max_concurrency:
+            raise ValueError("concurrency must satisfy 1 <= initial <= max")
+
+        self.logger = logging.getLogger(__name__)
+
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.throughput_window = throughput_window
+
+        self.__lock = threading.Lock()
+        self.__chunk_size = chunk_size
+        self.__concurrency = concurrency
+        self.__consecutive_rejections = 0
+        self.__successes = 0
+        self.__backoff_until = 0.0
+        self.__latency = None
+        self.__counters = {"documents": 0, "requests": 0, "rejections": 0, "retries": 0, "failures": 0}
+        self.__written = collections.deque()
+
+    @property
+    def chunk_size(self) -> int:
+        return self.__chunk_size
+
+    @property
+    def concurrency(self) -> int:
+        return self.__concurrency
+
+    @property
+    def stats(self) -> dict:
+        """
+        Current state for monitoring: chunk size, concurrency, whether (and how long) writes are backing off, the
+        latency of the last request, the documents written per second over the throughput window and the
+        totals of documents, requests, rejections, retries and failures
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__trim_window(now)
+
+            return {
+                "chunk_size": self.__chunk_size,
+                "concurrency": self.__concurrency,
+                "backing_off": self.__backoff_until > now,
+                "backoff_remaining": max(0.0, self.__backoff_until - now),
+                "consecutive_rejections": self.__consecutive_rejections,
+                "last_latency": self.__latency,
+                "documents_per_second": sum(n for _, n in self.__written) / self.throughput_window,
+                **self.__counters,
+            }
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Return the (jittered) seconds to wait before retry number attempt (starting at 0)
+        """
+        return random.uniform(0, min(self.max_backoff, self.initial_backoff * 2**attempt))
+
+    @staticmethod
+    def client(es_connection: Elasticsearch) -> Elasticsearch:
+        """
+        Return es_connection set up for controlled writes: the client no longer resends 429/503 rejections
+        back to back itself, so every rejection reaches the controller and is retried with backoff. Other retry
+        statuses configured on es_connection are kept.
+        """
+        retry_on_status = es_connection._retry_on_status
+
+        if retry_on_status is DEFAULT:
+            retry_on_status = es_connection.transport.retry_on_status
+        elif isinstance(retry_on_status, int):
+            retry_on_status = (retry_on_status,)
+
+        return es_connection.options(
+            retry_on_status=tuple(
+                x
+                for x in dict.fromkeys((*retry_on_status, *TRANSPORT_RETRY_STATUSES))
+                if x not in RETRY_STATUSES
+            )
+        )
+
+    def call(self, func: Callable, *args, **kwargs):
+        """
+        Call func (a single write, e.g. EsHandler._perform) and retry it with backoff while it is rejected with
+        429/503; other errors, and the last rejection once max_retries is exceeded, are raised. func should write
+        through a client made with client(), otherwise the client retries the rejections itself first.
+        """
+        attempt = 0
+
+        while True:
+            self.__wait_backoff()
+
+            start = time.perf_counter()
+            try:
+                ret_data = func(*args, **kwargs)
+            except ApiError as err:
+                if _status(err) not in RETRY_STATUSES or attempt >= self.max_retries:
+                    with self.__lock:
+                        self.__counters["failures"] += 1
+                    raise
+
+                self.__rejected(attempt)
+                attempt += 1
+                continue
+
+            self.__succeeded(1, time.perf_counter() - start)
+
+            return ret_data
+
+    def write(self, writer, documents: Iterable[dict], **kwargs) -> dict:
+        """
+        Write the documents with the BulkWriter, adapting its chunk size and (up to max_concurrency) the number of
+        concurrent bulk requests; items rejected with 429 are retried with backoff. In input order only with a
+        max_concurrency of 1, see the class docstring. Returns the same summary as BulkWriter.write
+        """
+        ret_dict = {"success": 0, "failed": 0, "errors": []}
+
+        def collect(results: List[Tuple[bool, dict]]):
+            for ok, item in results:
+                if ok:
+                    ret_dict["success"] += 1
+                else:
+                    ret_dict["failed"] += 1
+                    ret_dict["errors"].append(item)
+
+        writer.chunk_size = self.chunk_size
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix=f"eswrap-bulk-{writer.index}",
+        ) as executor:
+            pending = set()
+
+            for chunk in writer.chunk_actions(documents):
+                # the writer reads its chunk size while building the next chunk
+                writer.chunk_size = self.chunk_size
+
+                while len(pending) >= self.concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+
+                pending.add(executor.submit(self.__send_chunk, writer, chunk, kwargs))
+
+            for future in pending:
+                collect(future.result())
+
+        if ret_dict["failed"] > 0:
+            self.logger.warning(
+                f"Bulk write to {writer.index} finished with {ret_dict['failed']} failed item(s)"
+            )
+
+        return ret_dict
+
+    def stream(self, writer, documents: Iterable[dict], **kwargs) -> Iterator[Tuple[bool, dict]]:
+        """
+        Write the documents with the BulkWriter one bulk request at a time, adapting its chunk size and retrying
+        items rejected with 429 with backoff; yields a (success, item) tuple per document in input order
+        """
+        writer.chunk_size = self.chunk_size
+
+        for chunk in writer.chunk_actions(documents):
+            writer.chunk_size = self.chunk_size
+
+            yield from self.__send_chunk(writer, chunk, kwargs)
+
+    def __send_chunk(self, writer, chunk: list, kwargs: dict) -> List[Tuple[bool, dict]]:
+        ret_list = [None] * len(chunk)
+        positions = list(range(len(chunk)))
+        attempt = 0
+
+        while True:
+            self.__wait_backoff()
+
+            start = time.perf_counter()
+            try:
+                results = list(writer.send_chunk(chunk, **kwargs))
+            except ApiError as err:
+                if _status(err) not in RETRY_STATUSES or attempt >= self.max_retries:
+                    with self.__lock:
+                        self.__counters["failures"] += 1
+                    raise
+
+                self.__rejected(attempt)
+                attempt += 1
+                continue
+
+            elapsed = time.perf_counter() - start
+
+            rejected = []
+            for position, data, (ok, item) in zip(positions, chunk, results):
+                status = next(iter(item.values())).get("status")
+                if not ok and status in RETRY_STATUSES and attempt < self.max_retries:
+                    rejected.append((position, data))
+                else:
+                    ret_list[position] = (ok, item)
+
+            self.__succeeded(len(chunk) - len(rejected), elapsed, adapt=not rejected)
+
+            if not rejected:
+                return ret_list
+
+            self.__rejected(attempt)
+            attempt += 1
+            positions = [x for x, _ in rejected]
+            chunk = [x for _, x in rejected]
+
+    def __wait_backoff(self):
+        with self.__lock:
+            delay = self.__backoff_until - time.monotonic()
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def __rejected(self, attempt: int):
+        delay = self.backoff(attempt)
+
+        with self.__lock:
+            self.__counters["rejections"] += 1
+            self.__counters["retries"] += 1
+            self.__consecutive_rejections += 1
+            self.__successes = 0
+
+            # multiplicative decrease
+            self.__chunk_size = max(self.min_chunk_size, self.__chunk_size // 2)
+            self.__concurrency = max(1, self.__concurrency - 1)
+
+            self.__backoff_until = max(self.__backoff_until, time.monotonic() + delay)
+
+        self.logger.warning(
+            f"Write rejected by the cluster; backing off {delay:.2f}s, chunk size {self.__chunk_size}, "
+            f"concurrency {self.__concurrency}"
+        )
+
+    def __succeeded(self, documents: int, latency: float, adapt: bool = True):
+        with self.__lock:
+            now = time.monotonic()
+
+            self.__counters["documents"] += documents
+            self.__counters["requests"] += 1
+            self.__latency = latency
+            self.__written.append((now, documents))
+            self.__trim_window(now)
+
+            if not adapt:
+                return
+
+            self.__consecutive_rejections = 0
+
+            if latency > self.target_latency:
+                self.__chunk_size = max(
+                    self.min_chunk_size, int(self.__chunk_size * 0.8)
+                )
+                self.__successes = 0
+                return
+
+            # additive increase; concurrency grows after a run of fast requests
+            self.__chunk_size = min(
+                self.max_chunk_size, self.__chunk_size + max(1, self.__chunk_size // 10)
+            )
+            self.__successes += 1
+
+            if self.__successes >= 5 and self.__concurrency < self.max_concurrency:
+                self.__concurrency += 1
+                self.__successes = 0
+
+    def __trim_window(self, now: float):
+        while self.__written and self.__written[0][0] < now - self.throughput_window:
+            self.__written.popleft()
+
+    def __repr__(self):
+        """return a string representation of the obj WriteController"""
+        return "<< WriteController: chunk size {}, concurrency {} >>".format(
+            self.__chunk_size, self.__concurrency
+        )
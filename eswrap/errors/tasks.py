@@ -0,0 +1,10 @@
+class TaskError(Exception):
+    pass
+
+
+class TaskFailedError(TaskError):
+    pass
+
+
+class TaskTimeoutError(TaskError):
+    pass
@@ -2,7 +2,7 @@ import os
 
 from setuptools import setup, find_packages
 
-from eswrap import _version_from_git_describe
+from version import _version
 
 # The directory containing this file
 HERE = os.path.abspath(os.path.dirname(__file__))
@@ -17,8 +17,8 @@ with open(os.path.join(HERE, "requirements.txt")) as fid:
 
 setup(
     name="eswrap",
-    version=_version_from_git_describe(),
-    packages=find_packages(exclude=("tests", "test_data")),
+    version=_version(),
+    packages=find_packages(exclude=("tests", "test_data", "benchmarks")),
     url="",
     license="GNU General Public License v3.0",
     author="Paul Tikken",
@@ -37,4 +37,8 @@ setup(
     ],
     python_requires=">=3.10",
     install_requires=REQS,
+    extras_require={
+        "async": ["elasticsearch[async]>=8.10.0"],
+        "orjson": ["orjson>=3"],
+    },
 )
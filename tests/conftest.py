@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the tests answer requests with the canned response node of the benchmarks
+sys.path.insert(0, ROOT_DIR)
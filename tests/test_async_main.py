@@ -0,0 +1,62 @@
+import asyncio
+
+from benchmarks.fake_node import canned_async_client
+from eswrap.async_main import AsyncEsWrap
+from eswrap.core.metrics.metrics import MetricsCollector
+
+
+def refreshing_wrap(during_refresh) -> AsyncEsWrap:
+    """
+    Return an AsyncEsWrap on a cluster with the indexes 'a' and 'b', awaiting during_refresh(es) while the index
+    names are being listed
+    """
+    es = None
+
+    async def respond(body):
+        await during_refresh(es)
+        return {"indices": [{"name": "a"}, {"name": "b"}]}
+
+    es = AsyncEsWrap(
+        client=canned_async_client(
+            [
+                ("POST", "/_resolve/index", respond),
+                ("PUT", "/new/_doc/1", {"_id": "1", "result": "created"}),
+                ("PUT", "/created", {"acknowledged": True}),
+                ("DELETE", "/b", {"acknowledged": True}),
+            ]
+        )
+    )
+
+    return es
+
+
+def test_index_written_during_a_refresh_is_kept():
+    async def during_refresh(es):
+        await es.index("new", {"a": 1}, "1")
+        await es.create_index("created")
+
+    es = refreshing_wrap(during_refresh)
+    asyncio.run(es.setup_handlers_for_indexes())
+
+    assert sorted(es.index_dict) == ["a", "b", "created", "new"]
+
+
+def test_index_deleted_during_a_refresh_stays_deleted():
+    async def during_refresh(es):
+        await es.delete_index("b")
+
+    es = refreshing_wrap(during_refresh)
+    asyncio.run(es.setup_handlers_for_indexes())
+
+    assert sorted(es.index_dict) == ["a"]
+
+
+def test_index_listing_is_reported_to_the_metrics_hook():
+    async def during_refresh(es):
+        pass
+
+    es = refreshing_wrap(during_refresh)
+    es.metrics = MetricsCollector()
+    asyncio.run(es.setup_handlers_for_indexes())
+
+    assert es.metrics.snapshot()["*"]["resolve_index"]["count"] == 1
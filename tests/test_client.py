@@ -0,0 +1,50 @@
+import builtins
+import logging
+
+import pytest
+
+from eswrap.core.client.client import fast_json_serializer
+
+
+@pytest.fixture
+def missing_module(monkeypatch):
+    """
+    Make the import of the given module (or of a name from it) fail
+    """
+    real_import = builtins.__import__
+    missing = []
+
+    def fake_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if name in missing or any(f"{name}.{x}" in missing for x in fromlist or ()):
+            raise ImportError(name)
+        return real_import(name, globals, locals, fromlist, level)
+
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+
+    return missing
+
+
+def test_fast_json_serializer_uses_orjson():
+    pytest.importorskip("orjson")
+
+    assert type(fast_json_serializer()).__name__ == "OrjsonSerializer"
+
+
+def test_fast_json_serializer_without_orjson(missing_module, caplog):
+    missing_module.append("orjson")
+
+    with caplog.at_level(logging.WARNING):
+        assert fast_json_serializer() is None
+
+    assert "orjson is not installed" in caplog.text
+
+
+def test_fast_json_serializer_with_a_client_without_orjson_support(missing_module, caplog):
+    pytest.importorskip("orjson")
+    missing_module.append("elasticsearch.serializer.OrjsonSerializer")
+
+    with caplog.at_level(logging.WARNING):
+        assert fast_json_serializer() is None
+
+    assert "client has no orjson serializer" in caplog.text
+    assert "orjson is not installed" not in caplog.text
@@ -0,0 +1,200 @@
+import json
+import threading
+
+import pytest
+from elasticsearch import ApiError
+
+from benchmarks.fake_node import bulk_response, canned_client
+from eswrap.core.es_handler.es_handler import EsHandler
+
+
+def mget_response(body: bytes) -> dict:
+    # every even id exists
+    return {
+        "docs": [
+            {"_id": x, "found": True, "_source": {"n": int(x)}}
+            if int(x) % 2 == 0
+            else {"_id": x, "found": False}
+            for x in json.loads(body)["ids"]
+        ]
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_get_many_yields_documents_in_id_order(workers):
+    handler = EsHandler(canned_client([("POST", "/test/_mget", mget_response)]), "test")
+
+    ids = (str(x) for x in range(25))
+
+    assert list(handler.get_many(ids, chunk_size=4, workers=workers)) == [
+        (str(x), {"n": x} if x % 2 == 0 else None) for x in range(25)
+    ]
+
+
+def test_get_many_validates_its_arguments():
+    handler = EsHandler(canned_client([]), "test")
+
+    with pytest.raises(ValueError):
+        list(handler.get_many(["1"], chunk_size=0))
+
+    with pytest.raises(ValueError):
+        list(handler.get_many(["1"], workers=0))
+
+
+def test_by_query_requests():
+    received = []
+
+    def respond(body):
+        received.append(json.loads(body))
+        return {"task": "node:1"}
+
+    handler = EsHandler(
+        canned_client(
+            [
+                ("POST", "/test/_delete_by_query", respond),
+                ("POST", "/test/_update_by_query", respond),
+            ]
+        ),
+        "test",
+    )
+
+    handler.delete_by_query(handler.search().filter("term", status="old"), slices="auto")
+    task = handler.update_by_query(script="ctx._source.n += 1", wait_for_completion=False)
+
+    assert received == [
+        {"query": {"bool": {"filter": [{"term": {"status": "old"}}]}}},
+        {"script": {"source": "ctx._source.n += 1", "lang": "painless"}},
+    ]
+    assert task.task_id == "node:1"
+
+
+def export_handler(pages_per_slice, failing_slice=None) -> tuple:
+    """
+    Return a handler whose point in time searches answer pages_per_slice pages of 2 hits per slice, the last one
+    short, and fail for failing_slice; and the list of closed point in time ids
+    """
+    closed = []
+
+    def search(body):
+        body = json.loads(body)
+        slice_id = body.get("slice", {}).get("id", 0)
+        page = body["search_after"][0] + 1 if "search_after" in body else 0
+
+        if slice_id == failing_slice:
+            return 500, {"error": "slice failed", "status": 500}
+
+        size = 1 if page + 1 >= pages_per_slice else 2
+
+        return {
+            "pit_id": "pit",
+            "hits": {
+                "hits": [
+                    {"_id": f"{slice_id}-{page}-{i}", "_source": {}, "sort": [page]}
+                    for i in range(size)
+                ]
+            },
+        }
+
+    def close(body):
+        closed.append(json.loads(body)["id"])
+        return {"succeeded": True}
+
+    handler = EsHandler(
+        canned_client(
+            [
+                ("POST", "/test/_pit", {"id": "pit"}),
+                ("POST", "/_search", search),
+                ("DELETE", "/_pit", close),
+            ]
+        ),
+        "test",
+    )
+
+    return handler, closed
+
+
+def export_threads() -> list:
+    return [x for x in threading.enumerate() if x.name.startswith("eswrap-export-test")]
+
+
+def test_export_reads_all_slices():
+    handler, closed = export_handler(pages_per_slice=3)
+
+    documents = list(handler.export(slices=3, page_size=2))
+
+    assert sorted(x["_id"] for x in documents) == sorted(
+        f"{s}-{p}-{i}" for s in range(3) for p, n in enumerate((2, 2, 1)) for i in range(n)
+    )
+    assert closed == ["pit"]
+    assert export_threads() == []
+
+
+def test_export_callback_counts_documents():
+    handler, closed = export_handler(pages_per_slice=2)
+
+    seen = []
+
+    assert handler.export(slices=2, page_size=2, callback=seen.append) == 6
+    assert len(seen) == 6
+    assert closed == ["pit"]
+
+
+def test_abandoned_export_stops_the_workers_and_closes_the_pit():
+    # slices which never end; the workers block on the bounded queue
+    handler, closed = export_handler(pages_per_slice=10**9)
+
+    documents = handler.export(slices=4, page_size=2, queue_size=1)
+    next(documents)
+    documents.close()
+
+    assert closed == ["pit"]
+    assert export_threads() == []
+
+
+def test_failing_slice_raises_and_closes_the_pit():
+    handler, closed = export_handler(pages_per_slice=10**9, failing_slice=1)
+
+    with pytest.raises(ApiError):
+        list(handler.export(slices=3, page_size=2, queue_size=2))
+
+    assert closed == ["pit"]
+    assert export_threads() == []
+
+
+def test_bulk_upsert_chunks_on_bytes_and_moves_meta_fields_to_the_action():
+    requests = []
+
+    def respond(body):
+        requests.append([json.loads(x) for x in body.splitlines()])
+        return bulk_response(body)
+
+    handler = EsHandler(canned_client([("PUT", "/_bulk", respond)]), "test")
+
+    documents = [{"_id": str(i), "_routing": "r", "text": "x" * 100} for i in range(10)]
+
+    # every document takes 164 bytes, so three fit per request, far below the chunk size
+    ret_dict = handler.bulk_upsert(documents, chunk_size=500, max_chunk_bytes=600)
+
+    assert ret_dict == {"success": 10, "failed": 0, "errors": []}
+    assert [len(x) // 2 for x in requests] == [3, 3, 3, 1]
+
+    lines = [x for request in requests for x in request]
+
+    assert lines[0] == {"index": {"_index": "test", "_id": "0", "routing": "r"}}
+    assert lines[1] == {"text": "x" * 100}
+    # the documents given are left as they are
+    assert documents[0]["_id"] == "0"
+
+
+def test_bulk_upsert_chunks_on_count():
+    requests = []
+
+    def respond(body):
+        requests.append(body.count(b"\n") // 2)
+        return bulk_response(body)
+
+    handler = EsHandler(canned_client([("PUT", "/_bulk", respond)]), "test")
+
+    handler.bulk_upsert(({"n": i} for i in range(25)), chunk_size=10)
+
+    assert requests == [10, 10, 5]
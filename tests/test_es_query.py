@@ -0,0 +1,167 @@
+import json
+
+import pytest
+
+from benchmarks.fake_node import canned_client, search_response
+from eswrap.core.es_handler.es_handler import EsHandler
+from eswrap.core.es_query.es_query import EsQuery
+from eswrap.errors.queries import QueryTypeNotSupportedError
+
+
+def test_clauses_accumulate_per_operand_in_call_order():
+    query = (
+        EsQuery()
+        .filter("term", status="published")
+        .query("match", title="elastic")
+        .filter("range", year={"gte": 2015})
+        .query("match", tags=["a", "b"])
+        .exclude("term", lang="nl")
+    )
+
+    assert query.filter_data == {
+        "query": {
+            "bool": {
+                "filter": [
+                    {"term": {"status": "published"}},
+                    {"range": {"year": {"gte": 2015}}},
+                ],
+                "must": [{"match": {"title": "elastic"}}],
+                "should": [{"match": {"tags": "a"}}, {"match": {"tags": "b"}}],
+                "must_not": [{"term": {"lang": "nl"}}],
+            }
+        },
+        "size": 10,
+    }
+
+
+def test_rendered_body_holds_paging_sort_and_params():
+    query = (
+        EsQuery(limit=5, skip=10, sort=[{"year": "desc"}])
+        .match_all()
+        .only("title")
+        .set_track_total_hits(False)
+    )
+
+    assert query.filter_data == {
+        "query": {"bool": {"must": [{"match_all": {}}]}},
+        "_source": {"includes": ["title"]},
+        "track_total_hits": False,
+        "size": 5,
+        "from": 10,
+        "sort": [{"year": "desc"}],
+    }
+    assert EsQuery(limit=None).filter_data == {}
+
+
+def test_changes_to_a_clone_do_not_leak_into_the_original():
+    base = EsQuery().filter("term", status="published").only("title")
+    before = json.dumps(base.filter_data, sort_keys=True)
+
+    clone = (
+        base.clone()
+        .filter("term", lang="en")
+        .exclude("term", draft=True)
+        .only("body")
+        .set_limit(50)
+        .set_track_total_hits(True)
+    )
+
+    assert json.dumps(base.filter_data, sort_keys=True) == before
+    assert clone.filter_data["query"]["bool"]["filter"] == [
+        {"term": {"status": "published"}},
+        {"term": {"lang": "en"}},
+    ]
+    assert clone.filter_data["_source"] == {"includes": ["title", "body"]}
+    assert clone.filter_data["size"] == 50
+
+    # and the other way around
+    base.filter("term", year=2020)
+
+    assert len(clone.filter_data["query"]["bool"]["filter"]) == 2
+
+
+def test_filter_data_is_rendered_once_per_change():
+    query = EsQuery().filter("term", status="published")
+
+    body = query.filter_data
+
+    assert query.filter_data is body
+    assert query.body_key == query.body_key
+
+    query.set_skip(10)
+
+    assert query.filter_data is not body
+    assert query.filter_data["from"] == 10
+    assert "from" not in body
+
+
+def test_unsupported_query_types_are_rejected():
+    assert "ids" in EsQuery.supported_bool_query_types
+    assert "ids" not in EsQuery.supported_bool_filter_types
+
+    with pytest.raises(QueryTypeNotSupportedError):
+        EsQuery().filter("ids", values=["1"])
+
+    with pytest.raises(QueryTypeNotSupportedError):
+        EsQuery().query("script", script="true")
+
+
+def test_search_sends_the_rendered_body():
+    received = []
+
+    def respond(body):
+        received.append(json.loads(body))
+        return search_response(2)
+
+    handler = EsHandler(canned_client([("POST", "/test/_search", respond)]), "test")
+    cursor = handler.search().filter("term", status="published").set_limit(2)
+
+    ret_dict = cursor.search()
+
+    assert received == [cursor.filter_data]
+    assert [x["field_0"] for x in ret_dict["data"]] == ["value 0 0", "value 1 0"]
+    assert (ret_dict["total"], ret_dict["total_relation"]) == (2, "eq")
+
+
+def test_aggregations_are_only_sent_with_aggregation_and_profile_bodies():
+    query = EsQuery().filter("term", status="open").agg_terms("tags", "tags")
+
+    assert "aggs" not in query._search_body()
+    assert "aggs" not in query._stream_body(100)
+    assert query._aggregation_body()["aggs"] == {
+        "tags": {"terms": {"field": "tags", "size": 10}}
+    }
+    assert query._profile_body()["aggs"] == query._aggregation_body()["aggs"]
+
+    # the page body is otherwise the same as the rendered body
+    assert query._search_body() == {
+        k: v for k, v in query.filter_data.items() if k != "aggs"
+    }
+
+
+def test_total_of_an_empty_page_is_read_from_the_response():
+    query = EsQuery().set_limit(0)
+    response = {"hits": {"total": {"value": 500, "relation": "gte"}}}
+
+    ret_dict = query._parse_search_results(response)
+
+    assert ret_dict["data"] == []
+    assert (ret_dict["total"], ret_dict["total_relation"]) == (500, "gte")
+
+
+def test_total_is_none_without_hit_tracking():
+    ret_dict = EsQuery()._parse_search_results({})
+
+    assert (ret_dict["total"], ret_dict["total_relation"]) == (None, None)
+
+
+def test_stream_pages_do_not_count_hits():
+    query = EsQuery(sort=[{"created": "desc"}]).set_track_total_hits(True)
+
+    body = query._stream_body(100)
+
+    assert body["track_total_hits"] is False
+    assert body["size"] == 100
+    assert body["sort"] == [{"created": "desc"}]
+    # the search body is left alone
+    assert query._search_body()["track_total_hits"] is True
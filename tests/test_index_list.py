@@ -0,0 +1,43 @@
+from benchmarks.fake_node import canned_client
+from eswrap.core.index_list.index_list import IndexList
+
+
+def refreshing_list(during_refresh) -> IndexList:
+    """
+    Return an IndexList on a cluster with the indexes 'a' and 'b', calling during_refresh(index_list) while the
+    index names are being listed
+    """
+    index_list = None
+
+    def respond(body):
+        during_refresh(index_list)
+        return {"indices": [{"name": "a"}, {"name": "b"}]}
+
+    index_list = IndexList(canned_client([("POST", "/_resolve/index", respond)]))
+
+    return index_list
+
+
+def test_index_added_during_a_refresh_is_kept():
+    index_list = refreshing_list(lambda x: x.add_index("new"))
+
+    index_list.fill_index_list()
+
+    assert sorted(index_list.index_dict) == ["a", "b", "new"]
+
+
+def test_index_removed_during_a_refresh_stays_removed():
+    index_list = refreshing_list(lambda x: x.remove_index("b"))
+
+    index_list.fill_index_list()
+
+    assert sorted(index_list.index_dict) == ["a"]
+
+
+def test_changes_before_a_refresh_are_replaced_by_it():
+    index_list = refreshing_list(lambda x: None)
+    index_list.add_index("gone")
+
+    index_list.fill_index_list()
+
+    assert sorted(index_list.index_dict) == ["a", "b"]
@@ -0,0 +1,276 @@
+import json
+
+import pytest
+from elasticsearch import ApiError, NotFoundError
+
+from benchmarks.fake_node import canned_client, search_response
+from eswrap.core.metrics.metrics import MetricsCollector
+from eswrap.main import EsWrap
+from eswrap.errors.indexes import IndexNotFoundError
+
+
+def wrap(routes: list, indexes: tuple = ()) -> EsWrap:
+    """
+    Return an EsWrap on a cluster with the given indexes, with the index registry filled
+    """
+    return EsWrap(
+        client=canned_client(
+            [("POST", "/_resolve/index", {"indices": [{"name": x} for x in indexes]})]
+            + routes
+        ),
+        auto_init_index_handlers=True,
+        index_refresh_ttl=None,
+    )
+
+
+def test_failed_index_does_not_register_the_index():
+    es = wrap([])
+
+    with pytest.raises(NotFoundError):
+        es.index("missing", {"a": 1}, "1")
+
+    with pytest.raises(IndexNotFoundError):
+        es.get_index_handler("missing")
+
+
+def test_index_registers_the_index():
+    es = wrap([("PUT", "/new/_doc/1", {"_id": "1", "result": "created"})])
+
+    es.index("new", {"a": 1}, "1")
+
+    assert es.get_index_handler("new").index == "new"
+
+
+def test_failed_bulk_does_not_register_the_index():
+    item = {
+        "index": {
+            "_index": "missing",
+            "status": 404,
+            "error": {"type": "index_not_found_exception"},
+        }
+    }
+    es = wrap([("PUT", "/_bulk", {"took": 1, "errors": True, "items": [item, item]})])
+
+    assert es.bulk("missing", [{"a": 1}, {"a": 2}])["failed"] == 2
+
+    with pytest.raises(IndexNotFoundError):
+        es.get_index_handler("missing")
+
+
+def test_bulk_registers_the_index():
+    item = {"index": {"_index": "new", "status": 201}}
+    es = wrap([("PUT", "/_bulk", {"took": 1, "errors": False, "items": [item, item]})])
+
+    assert es.bulk("new", [{"a": 1}, {"a": 2}])["success"] == 2
+    assert es.get_index_handler("new").index == "new"
+
+
+def test_failed_server_reindex_does_not_register_the_dest():
+    es = wrap([])
+
+    with pytest.raises(NotFoundError):
+        es.reindex("src", "dst")
+
+    assert "dst" not in es.index_list
+
+
+def test_server_reindex_registers_the_dest():
+    es = wrap([("POST", "/_reindex", {"total": 1, "created": 1, "failures": []})])
+
+    assert es.reindex("src", "dst")["created"] == 1
+    assert es.get_index_handler("dst").index == "dst"
+
+
+def client_reindex_routes(bulk_item: dict) -> list:
+    """
+    Routes for a client side reindex of an index 'src' with a single document, answering every bulk item with
+    bulk_item
+    """
+    page = search_response(1, index="src")
+    page["pit_id"] = "pit"
+    page["hits"]["hits"][0]["sort"] = [0]
+
+    return [
+        ("POST", "/src/_pit", {"id": "pit"}),
+        ("POST", "/_search", page),
+        ("DELETE", "/_pit", {"succeeded": True}),
+        ("PUT", "/_bulk", {"took": 1, "errors": False, "items": [bulk_item]}),
+    ]
+
+
+def test_failed_client_reindex_does_not_register_the_dest():
+    item = {
+        "index": {
+            "_index": "dst",
+            "status": 404,
+            "error": {"type": "index_not_found_exception"},
+        }
+    }
+    es = wrap(client_reindex_routes(item), indexes=("src",))
+
+    ret_dict = es.reindex("src", "dst", transform=lambda x: x, slices=None)
+
+    assert ret_dict["failed"] == 1
+    assert "dst" not in es.index_list
+
+
+def test_client_reindex_registers_the_dest_of_the_target():
+    item = {"index": {"_index": "dst", "status": 201}}
+    es = wrap(client_reindex_routes(item), indexes=("src",))
+    target = wrap(client_reindex_routes(item))
+
+    ret_dict = es.reindex("src", "dst", target=target, slices=None)
+
+    assert ret_dict["success"] == 1
+    assert "dst" not in es.index_list
+    assert target.get_index_handler("dst").index == "dst"
+
+
+def bulk_load_wrap(restore_fails: bool) -> tuple:
+    """
+    Return an EsWrap on a cluster with the index 'logs' whose settings cannot be restored if restore_fails, and
+    the list of the requests made to the index
+    """
+    requests = []
+
+    def put_settings(body):
+        requests.append("put_settings")
+        if restore_fails and len(requests) > 1:
+            return 500, {"error": "restore failed", "status": 500}
+        return {"acknowledged": True}
+
+    def refresh(body):
+        requests.append("refresh")
+        return {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+
+    settings = {"index.refresh_interval": "5s", "index.number_of_replicas": "1"}
+    es = wrap(
+        [
+            ("GET", "/logs/_settings", {"logs": {"settings": settings}}),
+            ("PUT", "/logs/_settings", put_settings),
+            ("POST", "/logs/_refresh", refresh),
+        ],
+        indexes=("logs",),
+    )
+
+    return es, requests
+
+
+def test_bulk_load_restores_and_refreshes():
+    es, requests = bulk_load_wrap(restore_fails=False)
+
+    with es.bulk_load("logs") as handler:
+        assert handler.index == "logs"
+
+    assert requests == ["put_settings", "put_settings", "refresh"]
+
+
+def test_bulk_load_refreshes_and_raises_when_the_restore_fails():
+    es, requests = bulk_load_wrap(restore_fails=True)
+
+    with pytest.raises(ApiError):
+        with es.bulk_load("logs"):
+            pass
+
+    assert requests == ["put_settings", "put_settings", "refresh"]
+
+
+def test_bulk_load_keeps_the_error_of_the_with_block():
+    es, requests = bulk_load_wrap(restore_fails=True)
+
+    with pytest.raises(KeyError):
+        with es.bulk_load("logs"):
+            raise KeyError("load failed")
+
+    assert requests == ["put_settings", "put_settings", "refresh"]
+
+
+def sorted_search(index: str, values: list, received: list):
+    """
+    Return a search route response for index with a hit per sort value, recording the request bodies in received
+    """
+
+    def respond(body):
+        received.append((index, json.loads(body)))
+
+        page = search_response(len(values), index=index)
+        for hit, value in zip(page["hits"]["hits"], values):
+            hit["_id"] = f"{index}-{value}"
+            hit["sort"] = [value]
+
+        return page
+
+    return respond
+
+
+def search_many_wrap(received: list) -> EsWrap:
+    return wrap(
+        [
+            ("POST", "/a/_search", sorted_search("a", [1, 3, 3, 7], received)),
+            ("POST", "/b/_search", sorted_search("b", [2, 3, 4], received)),
+        ],
+        indexes=("a", "b"),
+    )
+
+
+def test_search_many_merges_by_sort_with_a_global_skip_and_limit():
+    received = []
+    es = search_many_wrap(received)
+
+    ret_dict = es.search_many(
+        ["a", "b"],
+        lambda cursor: cursor.set_sort([{"n": "asc"}]).set_skip(1).set_limit(4),
+    )
+
+    # ties keep the order of the indexes
+    assert [x["_id"] for x in ret_dict["data"]] == ["b-2", "a-3", "a-3", "b-3"]
+    assert [x["_index"] for x in ret_dict["data"]] == ["b", "a", "a", "b"]
+    assert (ret_dict["skip"], ret_dict["limit"]) == (1, 4)
+    assert (ret_dict["total"], ret_dict["total_relation"]) == (7, "eq")
+
+    # every index is searched for skip + limit hits from the start
+    for _, body in received:
+        assert body["size"] == 5
+        assert "from" not in body
+
+
+def test_search_many_leaves_the_cursors_alone():
+    received = []
+    es = search_many_wrap(received)
+    cursor = es.search("a").set_sort([{"n": "asc"}]).set_skip(2).set_limit(3)
+
+    es.search_many(["a", "b"], cursor)
+    es.search_many(["a", "b"], lambda x: cursor)
+
+    assert (cursor.q_skip, cursor.q_limit) == (2, 3)
+    # the same cursor returned for both indexes still searches each of them
+    assert sorted(x for x, _ in received) == ["a", "a", "b", "b"]
+
+
+def test_search_many_reports_failed_indexes():
+    received = []
+    es = wrap(
+        [("POST", "/a/_search", sorted_search("a", [1, 2], received))],
+        indexes=("a", "b"),
+    )
+
+    ret_dict = es.search_many(["a", "b"], lambda x: x.set_sort(["n"]))
+
+    assert [x["_id"] for x in ret_dict["data"]] == ["a-1", "a-2"]
+    assert list(ret_dict["errors"]) == ["b"]
+
+
+@pytest.mark.parametrize(
+    "filter_path", ["responses.hits.hits._source", ["responses.hits.hits._source"]]
+)
+def test_msearch_with_metrics_takes_a_filter_path_string_or_list(filter_path):
+    es = wrap(
+        [("POST", "/_msearch", {"took": 1, "responses": [search_response(2)]})],
+        indexes=("a",),
+    )
+    es.metrics = MetricsCollector()
+
+    ret_list = es.msearch([es.search("a")], filter_path=filter_path)
+
+    assert len(ret_list[0]["data"]) == 2
+    assert es.metrics.snapshot()["a"]["msearch"]["count"] == 1
@@ -0,0 +1,36 @@
+from benchmarks.fake_node import canned_client, search_response
+from eswrap.core.es_handler.es_handler import EsHandler
+from eswrap.core.query_cache.query_cache import QueryCache
+
+
+def test_set_drops_values_fetched_before_an_invalidation():
+    cache = QueryCache()
+
+    generation = cache.generation
+    cache.invalidate()
+    cache.set("key", "stale", generation)
+
+    assert cache.get("key") == (False, None)
+
+    cache.set("key", "fresh", cache.generation)
+
+    assert cache.get("key") == (True, "fresh")
+
+
+def test_search_in_flight_during_a_write_is_not_cached():
+    handler = None
+    responses = [search_response(1), search_response(2)]
+
+    def respond(body):
+        if len(responses) == 2:
+            # a write through the handler while the first search is in flight
+            handler.invalidate_cache()
+
+        return responses.pop(0)
+
+    handler = EsHandler(canned_client([("POST", "/test/_search", respond)]), "test")
+    handler.enable_cache()
+
+    assert len(handler.search().search()["data"]) == 1
+    assert len(handler.search().search()["data"]) == 2
+    assert len(handler.search().search()["data"]) == 2
@@ -0,0 +1,35 @@
+from eswrap.core.hit.hit import Hit
+from eswrap.core.sort_merge.sort_merge import merge_hits, sort_directions
+
+
+def hits(index: str, fields: list) -> list:
+    """
+    Return a Hit per dict of hit fields, with the ids index0, index1, ...
+    """
+    return [Hit({"_id": f"{index}{i}", "_index": index, **x}) for i, x in enumerate(fields)]
+
+
+def test_sort_directions():
+    assert sort_directions(None) == [("_score", True)]
+    assert sort_directions(["date", {"price": "desc"}, {"_score": {}}]) == [
+        ("date", False),
+        ("price", True),
+        ("_score", True),
+    ]
+    assert sort_directions({"n": {"order": "desc"}}) == [("n", True)]
+
+
+def test_merge_on_several_sort_fields_with_missing_values_last():
+    a = hits("a", [{"sort": [1, "z"]}, {"sort": [2, "b"]}, {"sort": [None, "a"]}])
+    b = hits("b", [{"sort": [2, "c"]}, {"sort": [2, "b"]}, {"sort": [None, "b"]}])
+
+    merged = merge_hits([a, b], ["n", {"s": "desc"}])
+
+    assert [x.id for x in merged] == ["a0", "b0", "a1", "b1", "b2", "a2"]
+
+
+def test_merge_without_sort_is_by_descending_score():
+    a = hits("a", [{"_score": 3.0}, {"_score": 1.0}])
+    b = hits("b", [{"_score": 2.0}, {"_score": 1.0}])
+
+    assert [x.id for x in merge_hits([a, b], None)] == ["a0", "b0", "a1", "b1"]
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+
+from benchmarks.fake_node import bulk_response, canned_client
+from eswrap.core.es_handler.es_handler import EsHandler
+from eswrap.core.write_controller.write_controller import WriteController
+
+REJECTED = (429, {"error": "rejected", "status": 429})
+
+
+def rejecting(times: int, response: dict):
+    """
+    Return a route response rejecting the first times requests with 429 and answering response after that, and
+    the list of received request bodies
+    """
+    received = []
+
+    def respond(body):
+        received.append(body)
+        return REJECTED if len(received) <= times else response
+
+    return respond, received
+
+
+def test_rejected_write_reaches_the_controller_every_time():
+    respond, received = rejecting(5, {"_id": "1", "result": "created"})
+    controller = WriteController(initial_backoff=0.001)
+    handler = EsHandler(
+        canned_client([("PUT", "/test/_doc/1", respond)]),
+        "test",
+        write_controller=controller,
+    )
+
+    assert handler.upsert({"a": 1}, "1")["result"] == "created"
+
+    # no back to back retries by the client in between the controlled ones
+    assert len(received) == 6
+    assert controller.stats["rejections"] == 5
+
+
+def test_write_without_controller_keeps_client_retries():
+    respond, received = rejecting(2, {"_id": "1", "result": "created"})
+    handler = EsHandler(canned_client([("PUT", "/test/_doc/1", respond)]), "test")
+
+    assert handler.upsert({"a": 1}, "1")["result"] == "created"
+    assert len(received) == 3
+
+
+def test_bulk_writes_are_sent_one_chunk_at_a_time_by_default():
+    lock = threading.Lock()
+    in_flight = [0, 0]
+    ids = []
+
+    def respond(body):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+
+        ids.extend(json.loads(x)["index"]["_id"] for x in body.splitlines()[::2])
+        time.sleep(0.001)
+
+        with lock:
+            in_flight[0] -= 1
+
+        return bulk_response(body)
+
+    controller = WriteController(chunk_size=10, min_chunk_size=1)
+    handler = EsHandler(
+        canned_client([("PUT", "/_bulk", respond)]),
+        "test",
+        write_controller=controller,
+    )
+
+    ret_dict = handler.bulk_upsert({"_id": str(i % 7), "n": i} for i in range(500))
+
+    assert ret_dict["success"] == 500
+    assert in_flight[1] == 1
+    assert ids == [str(i % 7) for i in range(500)]
+
+
+def test_controlled_client_keeps_the_configured_retry_statuses():
+    client = canned_client([]).options(retry_on_status=(500, 503))
+    handler = EsHandler(client, "test", write_controller=WriteController())
+
+    assert handler.write_connection._retry_on_status == (500, 502, 504)
+    # made once, not on every write
+    assert handler.write_connection is handler.write_connection
+
+
+def test_controlled_client_follows_the_controller():
+    client = canned_client([])
+    handler = EsHandler(client, "test")
+
+    assert handler.write_connection is client
+
+    handler.write_controller = WriteController()
+    assert handler.write_connection._retry_on_status == (502, 504)
+
+    handler.write_controller = None
+    assert handler.write_connection is client